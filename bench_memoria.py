@@ -0,0 +1,89 @@
+"""
+Benchmark de memória: licitações normalizadas como dict vs Licitacao.
+Uso: python bench_memoria.py [quantidade]
+"""
+import gc
+import json
+import random
+import sys
+import tracemalloc
+
+from services.api_client import NormalizadorComprasGov
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+UFS = ["SP", "RJ", "MG", "RS", "PR", "BA", "PE", "CE", "GO", "DF"]
+SITUACOES = ["Divulgada no PNCP", "Encerrada", "Suspensa", "Revogada"]
+OBJETOS = [
+    "Aquisição de material de expediente para atender as necessidades da secretaria",
+    "Contratação de empresa especializada em serviços de limpeza e conservação predial",
+    "Registro de preços para eventual aquisição de lousas de vidro e quadros brancos",
+    "Prestação de serviços de manutenção preventiva e corretiva de ar condicionado",
+]
+
+
+def pagina_14133(n: int) -> bytes:
+    """Corpo de resposta sintético no formato do ComprasGov 14.133."""
+    registros = []
+    for i in range(n):
+        registros.append({
+            "idCompra": f"{random.randint(100000, 999999)}{i:08d}",
+            "numeroControlePNCP": f"{random.randint(10**13, 10**14)}-1-{i:06d}/2026",
+            "modalidadeNome": "Pregão - Eletrônico",
+            "codigoModalidade": 1,
+            "objetoCompra": f"{random.choice(OBJETOS)} — processo {i}",
+            "valorTotalEstimado": round(random.uniform(1000, 900000), 2),
+            "valorTotalHomologado": None,
+            "orgaoEntidadeRazaoSocial": f"MUNICIPIO DE CIDADE {i % 500}",
+            "unidadeOrgaoCodigoUnidade": str(100000 + i % 900),
+            "unidadeOrgaoUfSigla": random.choice(UFS),
+            "unidadeOrgaoMunicipioNome": f"Cidade {i % 500}",
+            "situacaoCompraNomePncp": random.choice(SITUACOES),
+            "dataPublicacaoPncp": "2026-10-10T09:30:00",
+            "dataAberturaPropostaPncp": "2026-10-11T08:00:00",
+            "dataEncerramentoPropostaPncp": "2026-10-25T18:00:00",
+            "processo": f"{i}/2026",
+            "srp": bool(i % 2),
+            "informacaoComplementar": "Edital e anexos disponíveis no portal. " * 4,
+            "amparoLegal": {"codigo": 1, "nome": "Lei 14.133/2021, Art. 28, I",
+                            "descricao": "pregão"},
+        })
+    return json.dumps({"resultado": registros}).encode("utf-8")
+
+
+def como_dict(normalizador, raw: dict) -> dict:
+    """Representação anterior: dict de 21 chaves com o payload decodificado."""
+    lic = normalizador._normalizar_14133(raw).para_dict()
+    lic["dados_brutos"] = raw
+    return lic
+
+
+def medir(corpo: bytes, normalizar) -> tuple:
+    """(bytes retidos, pico) para normalizar e manter N licitações."""
+    gc.collect()
+    tracemalloc.start()
+    registros = json.loads(corpo)["resultado"]
+    licitacoes = [normalizar(r) for r in registros]
+    del registros
+    gc.collect()
+    retido, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(licitacoes) == N
+    return retido, pico
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    corpo = pagina_14133(N)
+    normalizador = NormalizadorComprasGov()
+
+    print(f"📦 {N} licitações ({len(corpo) / 1e6:.1f} MB de JSON)")
+    resultados = {
+        "dict": medir(corpo, lambda r: como_dict(normalizador, r)),
+        "Licitacao": medir(corpo, normalizador._normalizar_14133),
+    }
+    for nome, (retido, pico) in resultados.items():
+        print(f"  {nome:<10} retido {retido / 1e6:7.1f} MB · pico {pico / 1e6:7.1f} MB "
+              f"· {retido / N:6.0f} B/licitação")
+    base = resultados["dict"][0]
+    print(f"✅ Licitacao usa {resultados['Licitacao'][0] / base:.0%} da memória dos dicts")
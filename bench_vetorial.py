@@ -0,0 +1,105 @@
+"""
+Benchmark do modo de match: fuzzy (partial/token_set) × vetorial (TF-IDF).
+Uso: python bench_vetorial.py [quantidade]
+
+Objetos longos sintéticos com termos plantados (às vezes no plural, sem
+acento ou com as palavras trocadas de ordem) e distratores que contêm só uma
+palavra do termo. Recall e precisão são medidos contra os pares plantados.
+"""
+import random
+import sys
+import time
+
+from services.licitacao import Licitacao
+from services import vetorial
+from services.matcher import MatcherGlobal
+from services.scoring import obter_scorer
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+PERFIS = {
+    "lousas": ["lousa de vidro", "quadro branco", "quadro de avisos"],
+    "limpeza": ["limpeza predial", "conservação predial", "material de limpeza"],
+    "climatizacao": ["ar condicionado", "manutenção de climatizadores", "split inverter"],
+    "pavimentacao": ["pavimentação asfáltica", "recapeamento", "tapa buraco"],
+    "informatica": ["computadores desktop", "notebooks", "licenças de software"],
+    "alimentacao": ["gêneros alimentícios", "merenda escolar", "hortifrutigranjeiros"],
+    "veiculos": ["locação de veículos", "manutenção de frota", "combustível"],
+    "saude": ["medicamentos", "material hospitalar", "equipamentos odontológicos"],
+}
+
+ENCHIMENTO = (
+    "aquisição contratação empresa especializada para atender demanda secretaria municipal "
+    "conforme especificações termo referência edital anexos quantidades estimadas prazo "
+    "entrega execução serviços fornecimento registro preços eventual futura unidades "
+    "escolares administrativas saúde educação assistência social exercício órgão "
+    "participante gerenciador lote item global menor preço critério julgamento"
+).split()
+
+
+def variante(termo: str, rnd: random.Random) -> str:
+    palavras = termo.split()
+    sorteio = rnd.random()
+    if sorteio < 0.25:
+        palavras[-1] += "s"  # plural
+    elif sorteio < 0.5:
+        return termo.translate(str.maketrans("áâãçéêíóôú", "aaaceeioou"))
+    elif sorteio < 0.6 and len(palavras) > 1:
+        palavras = palavras[::-1]
+    return " ".join(palavras)
+
+
+def gerar(n: int, semente: int = 0) -> tuple:
+    """(licitações, pares plantados {(id_compra, perfil)})."""
+    rnd = random.Random(semente)
+    lics, plantados = [], set()
+    for i in range(n):
+        texto = rnd.choices(ENCHIMENTO, k=rnd.randint(40, 100))
+        sorteio = rnd.random()
+        perfil = rnd.choice(list(PERFIS))
+        termo = rnd.choice(PERFIS[perfil])
+        if sorteio < 0.1:
+            texto.insert(rnd.randrange(len(texto)), variante(termo, rnd))
+            plantados.add((str(i), perfil))
+        elif sorteio < 0.2:
+            texto.insert(rnd.randrange(len(texto)), rnd.choice(termo.split()))  # distrator
+        lics.append(Licitacao(id_compra=str(i), fonte="comprasgov_legado", objeto=" ".join(texto)))
+    return lics, plantados
+
+
+def perfis(modo: str) -> list:
+    return [
+        {"id": nome, "modo_match": modo,
+         "termos_busca": [{"id": f"{nome}-{j}", "termo": t} for j, t in enumerate(termos)]}
+        for nome, termos in PERFIS.items()
+    ]
+
+
+def avaliar(resultados: dict, plantados: set) -> tuple:
+    achados = {(m["licitacao"]["id_compra"], p) for p, r in resultados.items() for m in r["matches"]}
+    certos = len(achados & plantados)
+    return certos / max(1, len(plantados)), certos / max(1, len(achados)), len(achados)
+
+
+def rodar(nome: str, matcher: MatcherGlobal, lics: list, plantados: set):
+    inicio = time.perf_counter()
+    resultados = matcher.casar(lics)
+    tempo = time.perf_counter() - inicio
+    recall, precisao, achados = avaliar(resultados, plantados)
+    print(f"  {nome:<22} {tempo:7.2f}s  recall {recall:6.1%}  precisão {precisao:6.1%}  "
+          f"({achados} matches)")
+
+
+if __name__ == "__main__":
+    lics, plantados = gerar(N)
+    print(f"📊 {N} objetos (~{sum(len(l.objeto) for l in lics) // N} caracteres), "
+          f"{len(plantados)} pares plantados")
+    scorer = obter_scorer()
+    rodar(f"fuzzy ({scorer.nome})", MatcherGlobal(perfis("fuzzy"), scorer), lics, plantados)
+    rodar("fuzzy + prefiltro 0.1", MatcherGlobal(perfis("fuzzy"), scorer, cobertura=0.1),
+          lics, plantados)
+    for limiar in (0.25, 0.35, 0.45):
+        matcher = MatcherGlobal(perfis("vetorial"), scorer)
+        matcher.vetorial.limiar, matcher.vetorial.top_k = limiar, N
+        rodar(f"vetorial ≥ {limiar}", matcher, lics, plantados)
+    print(f"  (padrão do modo vetorial: limiar {vetorial.LIMIAR}, top-{vetorial.TOP_K} por perfil)")
@@ -0,0 +1,154 @@
+-- ============================================
+-- 000 — Sincronização incremental e ingestão
+-- DDL que entrou no schema.sql depois da primeira versão: bancos criados
+-- antes recebem tudo por aqui. Idempotente (também roda em banco novo,
+-- depois do schema.sql).
+-- ============================================
+
+-- Perfis: modo vetorial e filtros de exclusão
+ALTER TABLE perfis_busca ADD COLUMN IF NOT EXISTS modo_match TEXT NOT NULL DEFAULT 'fuzzy'
+    CHECK (modo_match IN ('fuzzy', 'vetorial'));
+ALTER TABLE perfis_busca ADD COLUMN IF NOT EXISTS termos_exclusao TEXT[] DEFAULT '{}';
+ALTER TABLE perfis_busca ADD COLUMN IF NOT EXISTS excluir_encerradas BOOLEAN DEFAULT FALSE;
+
+-- Watermarks da sincronização incremental (última data vista por consulta)
+CREATE TABLE IF NOT EXISTS sync_watermarks (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    uf TEXT NOT NULL DEFAULT '',
+    modalidade INT NOT NULL DEFAULT 0,
+    ultima_data DATE,
+    shards_pendentes JSONB NOT NULL DEFAULT '[]',  -- [[inicio, fim], ...] que falharam
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(endpoint, uf, modalidade)
+);
+-- Tabelas criadas antes dos shards
+ALTER TABLE sync_watermarks ADD COLUMN IF NOT EXISTS shards_pendentes JSONB NOT NULL DEFAULT '[]';
+
+ALTER TABLE sync_watermarks ENABLE ROW LEVEL SECURITY;
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE schemaname = 'public' AND tablename = 'sync_watermarks' AND policyname = 'allow_all'
+    ) THEN
+        CREATE POLICY "allow_all" ON sync_watermarks FOR ALL USING (true) WITH CHECK (true);
+    END IF;
+END
+$$;
+
+-- Ingestão de uma busca numa única transação (chamada via sb.rpc):
+-- upsert das licitações, vínculos com os perfis e status 'nova' só para as
+-- licitações realmente novas. Cada item de `itens` é
+--   {"licitacao": {...campos de licitacoes...}, "perfil_id", "termo_encontrado",
+--    "score_match", "prioridade"}
+-- (dados_brutos pode vir como objeto ou como texto JSON). Devolve uma linha
+-- por id_compra com resultado 'inserted', 'updated' ou 'unchanged' — uma
+-- licitação revista sem mudanças não é regravada nem contada como nova.
+CREATE OR REPLACE FUNCTION ingerir_licitacoes(itens JSONB)
+RETURNS TABLE (id_compra TEXT, licitacao_id UUID, resultado TEXT)
+LANGUAGE sql
+AS $$
+    WITH entrada AS (
+        -- Uma linha por id_compra (o upsert não aceita a mesma chave duas vezes)
+        SELECT DISTINCT ON (l.id_compra)
+            l.*,
+            CASE jsonb_typeof(e.item->'licitacao'->'dados_brutos')
+                WHEN 'string' THEN (e.item->'licitacao'->>'dados_brutos')::jsonb
+                ELSE e.item->'licitacao'->'dados_brutos'
+            END AS bruto,
+            e.item
+        FROM jsonb_array_elements(itens) WITH ORDINALITY AS e(item, ordem),
+             jsonb_populate_record(NULL::licitacoes, (e.item->'licitacao') - 'dados_brutos') AS l
+        WHERE l.id_compra IS NOT NULL
+        ORDER BY l.id_compra, e.ordem
+    ),
+    anteriores AS (
+        SELECT l.id, l.id_compra
+        FROM licitacoes l JOIN entrada en ON en.id_compra = l.id_compra
+    ),
+    gravadas AS (
+        INSERT INTO licitacoes AS l (
+            id_compra, numero_controle_pncp, fonte, modalidade, modalidade_codigo, objeto,
+            valor_estimado, valor_homologado, orgao, uasg, uf, municipio, situacao,
+            data_publicacao, data_abertura_proposta, data_encerramento_proposta,
+            data_resultado, numero_itens, numero_processo, srp, dados_brutos
+        )
+        SELECT
+            id_compra, numero_controle_pncp, fonte, modalidade, modalidade_codigo, objeto,
+            valor_estimado, valor_homologado, orgao, uasg, uf, municipio, situacao,
+            data_publicacao, data_abertura_proposta, data_encerramento_proposta,
+            data_resultado, numero_itens, numero_processo, COALESCE(srp, FALSE), bruto
+        FROM entrada
+        ON CONFLICT (id_compra) DO UPDATE SET
+            numero_controle_pncp = EXCLUDED.numero_controle_pncp,
+            fonte = EXCLUDED.fonte,
+            modalidade = EXCLUDED.modalidade,
+            modalidade_codigo = EXCLUDED.modalidade_codigo,
+            objeto = EXCLUDED.objeto,
+            valor_estimado = EXCLUDED.valor_estimado,
+            valor_homologado = EXCLUDED.valor_homologado,
+            orgao = EXCLUDED.orgao,
+            uasg = EXCLUDED.uasg,
+            uf = EXCLUDED.uf,
+            municipio = EXCLUDED.municipio,
+            situacao = EXCLUDED.situacao,
+            data_publicacao = EXCLUDED.data_publicacao,
+            data_abertura_proposta = EXCLUDED.data_abertura_proposta,
+            data_encerramento_proposta = EXCLUDED.data_encerramento_proposta,
+            data_resultado = EXCLUDED.data_resultado,
+            numero_itens = EXCLUDED.numero_itens,
+            numero_processo = EXCLUDED.numero_processo,
+            srp = EXCLUDED.srp,
+            dados_brutos = EXCLUDED.dados_brutos,
+            updated_at = NOW()
+        -- Sem mudança: a linha não é tocada (nem updated_at)
+        WHERE (l.numero_controle_pncp, l.fonte, l.modalidade, l.modalidade_codigo, l.objeto,
+               l.valor_estimado, l.valor_homologado, l.orgao, l.uasg, l.uf, l.municipio,
+               l.situacao, l.data_publicacao, l.data_abertura_proposta,
+               l.data_encerramento_proposta, l.data_resultado, l.numero_itens,
+               l.numero_processo, l.srp, l.dados_brutos)
+        IS DISTINCT FROM
+              (EXCLUDED.numero_controle_pncp, EXCLUDED.fonte, EXCLUDED.modalidade,
+               EXCLUDED.modalidade_codigo, EXCLUDED.objeto, EXCLUDED.valor_estimado,
+               EXCLUDED.valor_homologado, EXCLUDED.orgao, EXCLUDED.uasg, EXCLUDED.uf,
+               EXCLUDED.municipio, EXCLUDED.situacao, EXCLUDED.data_publicacao,
+               EXCLUDED.data_abertura_proposta, EXCLUDED.data_encerramento_proposta,
+               EXCLUDED.data_resultado, EXCLUDED.numero_itens, EXCLUDED.numero_processo,
+               EXCLUDED.srp, EXCLUDED.dados_brutos)
+        RETURNING l.id, l.id_compra, (l.xmax = 0) AS inserida  -- xmax = 0: linha recém-inserida
+    ),
+    linhas AS (
+        SELECT
+            en.id_compra,
+            COALESCE(g.id, a.id) AS licitacao_id,
+            CASE
+                WHEN g.inserida THEN 'inserted'
+                WHEN g.id IS NOT NULL THEN 'updated'
+                ELSE 'unchanged'
+            END AS resultado,
+            en.item
+        FROM entrada en
+        LEFT JOIN gravadas g ON g.id_compra = en.id_compra
+        LEFT JOIN anteriores a ON a.id_compra = en.id_compra
+    ),
+    vinculos AS (
+        INSERT INTO licitacao_perfil (licitacao_id, perfil_id, termo_encontrado, score_match)
+        SELECT licitacao_id, (item->>'perfil_id')::uuid, item->>'termo_encontrado',
+               (item->>'score_match')::float
+        FROM linhas
+        WHERE licitacao_id IS NOT NULL AND item->>'perfil_id' IS NOT NULL
+        ON CONFLICT (licitacao_id, perfil_id) DO UPDATE SET
+            termo_encontrado = EXCLUDED.termo_encontrado,
+            score_match = EXCLUDED.score_match
+    ),
+    status AS (
+        -- Status só para as novas: quem já está no pipeline fica onde está
+        INSERT INTO licitacao_status (licitacao_id, status, prioridade)
+        SELECT licitacao_id, 'nova', COALESCE(item->>'prioridade', 'normal')
+        FROM linhas
+        WHERE resultado = 'inserted'
+        ON CONFLICT (licitacao_id) DO NOTHING
+    )
+    SELECT id_compra, licitacao_id, resultado FROM linhas;
+$$;
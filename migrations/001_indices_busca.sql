@@ -0,0 +1,58 @@
+-- ============================================
+-- 001 — Índices e busca textual
+-- Busca por texto ranqueada (FTS em português, sem acentos) e índices das
+-- consultas do Feed/Análise. Idempotente.
+-- ============================================
+
+CREATE SCHEMA IF NOT EXISTS extensions;
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA extensions;
+
+-- unaccent() é STABLE; a coluna gerada precisa de uma versão IMMUTABLE
+-- (dicionário fixo)
+CREATE OR REPLACE FUNCTION sem_acento(texto TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+SET search_path = extensions, public, pg_catalog
+AS $$
+    SELECT unaccent('unaccent'::regdictionary, texto)
+$$;
+
+-- Vetor de busca do objeto (config portuguese, sem acentos)
+ALTER TABLE licitacoes ADD COLUMN IF NOT EXISTS busca TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('portuguese', sem_acento(COALESCE(objeto, '')))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_licitacoes_busca ON licitacoes USING GIN (busca);
+-- ILIKE '%...%' (e similaridade) no objeto
+CREATE INDEX IF NOT EXISTS idx_licitacoes_objeto_trgm ON licitacoes
+    USING GIN (objeto extensions.gin_trgm_ops);
+
+-- Ordenação e filtros do Feed
+CREATE INDEX IF NOT EXISTS idx_licitacoes_data_publicacao ON licitacoes (data_publicacao DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_licitacoes_created_at ON licitacoes (created_at);
+CREATE INDEX IF NOT EXISTS idx_licitacoes_uf ON licitacoes (uf);
+CREATE INDEX IF NOT EXISTS idx_licitacoes_modalidade ON licitacoes (modalidade);
+CREATE INDEX IF NOT EXISTS idx_licitacoes_encerramento ON licitacoes (data_encerramento_proposta);
+
+-- Chaves estrangeiras (o UNIQUE de licitacao_perfil só cobre licitacao_id primeiro)
+CREATE INDEX IF NOT EXISTS idx_licitacao_perfil_perfil ON licitacao_perfil (perfil_id);
+CREATE INDEX IF NOT EXISTS idx_historico_buscas_perfil_data ON historico_buscas (perfil_id, data_busca);
+
+-- Busca ranqueada: casa pelo vetor (palavras inteiras, stemming) ou por
+-- trecho do objeto (ILIKE, via trigramas); ordena por relevância e data.
+-- Aceita a sintaxe de busca web ("frase exata", -exclusão, OR).
+CREATE OR REPLACE FUNCTION buscar_licitacoes(consulta TEXT)
+RETURNS SETOF licitacoes
+LANGUAGE sql STABLE
+SET search_path = extensions, public, pg_catalog
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('portuguese', sem_acento(consulta)) AS tsq,
+               '%' || replace(replace(replace(consulta, '\', '\\'), '%', '\%'), '_', '\_') || '%' AS padrao
+    )
+    SELECT l.*
+    FROM licitacoes l, q
+    WHERE l.busca @@ q.tsq OR l.objeto ILIKE q.padrao
+    ORDER BY ts_rank_cd(l.busca, q.tsq) DESC, similarity(l.objeto, consulta) DESC,
+             l.data_publicacao DESC NULLS LAST, l.id DESC
+$$;
@@ -0,0 +1,33 @@
+-- ============================================
+-- 002 — Busca textual por índice de expressão
+-- A coluna gerada `busca` (001) vinha em todo select("*") e no retorno de
+-- buscar_licitacoes (Feed, Análise, app): um tsvector por linha que ninguém
+-- lê. O vetor passa a existir só no índice GIN, com a mesma expressão na
+-- função de busca. Idempotente.
+-- ============================================
+
+-- Vetor de busca do objeto (config portuguese, sem acentos), só no índice
+CREATE INDEX IF NOT EXISTS idx_licitacoes_objeto_fts ON licitacoes
+    USING GIN (to_tsvector('portuguese', sem_acento(COALESCE(objeto, ''))));
+
+-- Mesma busca da 001; a expressão é idêntica à do índice para que ele seja usado
+CREATE OR REPLACE FUNCTION buscar_licitacoes(consulta TEXT)
+RETURNS SETOF licitacoes
+LANGUAGE sql STABLE
+SET search_path = extensions, public, pg_catalog
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('portuguese', sem_acento(consulta)) AS tsq,
+               '%' || replace(replace(replace(consulta, '\', '\\'), '%', '\%'), '_', '\_') || '%' AS padrao
+    )
+    SELECT l.*
+    FROM licitacoes l, q
+    WHERE to_tsvector('portuguese', sem_acento(COALESCE(l.objeto, ''))) @@ q.tsq
+       OR l.objeto ILIKE q.padrao
+    ORDER BY ts_rank_cd(to_tsvector('portuguese', sem_acento(COALESCE(l.objeto, ''))), q.tsq) DESC,
+             similarity(l.objeto, consulta) DESC,
+             l.data_publicacao DESC NULLS LAST, l.id DESC
+$$;
+
+-- Sem a coluna, o índice dela cai junto
+ALTER TABLE licitacoes DROP COLUMN IF EXISTS busca;
@@ -24,6 +24,7 @@ st.markdown("Selecione os perfis e categorias para buscar novas licitações.")
 try:
     from services import supabase_client as db
     from services.search_engine import SearchEngine
+    from services.vetorial import TOP_K
 
     # Carregar categorias e perfis
     categorias = db.listar_categorias()
@@ -36,6 +37,11 @@ try:
     col_config1, col_config2 = st.columns([1, 3])
     with col_config1:
         dias = st.selectbox("📅 Buscar últimos", [3, 7, 14, 30], index=1, format_func=lambda x: f"{x} dias")
+    with col_config2:
+        busca_completa = st.checkbox(
+            "🔄 Busca completa",
+            help="Ignora a sincronização incremental e baixa a janela inteira novamente."
+        )
 
     st.markdown("---")
 
@@ -105,15 +111,28 @@ try:
         resultados_total = {"encontradas": 0, "novas": 0}
         resultados_por_perfil = []
 
-        for i, perfil in enumerate(perfis_selecionados):
-            # Carregar termos do perfil
+        # Carregar termos dos perfis
+        for perfil in perfis_selecionados:
             perfil["termos_busca"] = db.listar_termos(perfil["id"])
-            
+
+        # Baixar as licitações uma única vez para todos os perfis
+        status_text.markdown("📡 **Consultando APIs...**")
+        corpus = engine.montar_corpus(
+            perfis_selecionados, dias_atras=dias, incremental=not busca_completa
+        )
+        # Reaproveitado pelo backfill de termos novos (página Perfis)
+        st.session_state["ultimo_corpus"] = corpus
+        # Matching de todos os perfis numa única passada sobre o corpus
+        matcher = engine.criar_matcher(perfis_selecionados)
+
+        for i, perfil in enumerate(perfis_selecionados):
             status_text.markdown(f"🔍 **Buscando:** {perfil['nome']}...")
             progress_bar.progress((i) / len(perfis_selecionados))
             
             try:
-                resultado = engine.buscar_por_perfil(perfil, dias_atras=dias)
+                resultado = engine.buscar_por_perfil(
+                    perfil, dias_atras=dias, corpus=corpus, matcher=matcher
+                )
                 resultados_total["encontradas"] += resultado["encontradas"]
                 resultados_total["novas"] += resultado["novas"]
                 resultados_por_perfil.append({
@@ -131,6 +150,9 @@ try:
 
         progress_bar.progress(1.0)
         status_text.empty()
+        # Licitações novas salvas: o Feed recarrega do topo na próxima visita
+        if resultados_total["novas"]:
+            st.session_state.pop("feed_filtros", None)
 
         # Resultado final
         st.markdown("---")
@@ -142,11 +164,22 @@ try:
                     <strong>{resultados_total['encontradas']}</strong> licitações relevantes · 
                     <strong>{resultados_total['novas']}</strong> novas salvas
                 </p>
+                <p style="color:#b3b3b3;">
+                    📡 {len(corpus)} licitações no escopo · 🚫 {corpus.estatisticas.get('descartadas_filtro', 0)} descartadas pelos filtros · ⏭️ {corpus.estatisticas.get('dias_pulados', 0)} dias já sincronizados
+                    · 🔁 {corpus.estatisticas.get('retries', 0)} retries · ⚠️ {corpus.estatisticas.get('paginas_perdidas', 0)} páginas perdidas
+                    · 🧩 {corpus.estatisticas.get('shards_pendentes', 0)} shards pendentes
+                </p>
             </div>
             """,
             unsafe_allow_html=True
         )
 
+        if corpus.estatisticas.get("erro_api"):
+            st.error(
+                f"⚠️ Consulta às APIs interrompida: {corpus.estatisticas['erro_api']} — "
+                "o que não foi baixado ficou pendente para a próxima busca"
+            )
+
         # Detalhes por perfil
         st.markdown("### 📊 Resultados por Perfil")
         for r in resultados_por_perfil:
@@ -157,6 +190,11 @@ try:
                 st.markdown(f"🎯 {r.get('encontradas', 0)} matches")
             with col3:
                 st.markdown(f"🆕 {r.get('novas', 0)} novas")
+            if r.get("truncadas"):
+                st.warning(
+                    f"✂️ {r['truncadas']} matches vetoriais além do limite de {TOP_K} por perfil "
+                    "ficaram de fora — refine os termos ou os filtros"
+                )
             if r.get("erro"):
                 st.error(f"⚠️ {r['erro']}")
 
@@ -28,8 +28,31 @@ try:
     # Sidebar filters
     filtros = render_sidebar_filters()
 
-    # Load data
-    licitacoes = db.listar_licitacoes(filtros=filtros, limite=100)
+    PAGINA_FEED = 100
+
+    # Recomeça do topo na próxima execução (a busca da página Buscar faz o mesmo)
+    def atualizar_feed():
+        st.session_state.pop("feed_filtros", None)
+
+    st.button("🔄 Atualizar", on_click=atualizar_feed, help="Recarrega o feed do início")
+
+    # Páginas já carregadas ficam na sessão; filtros novos recomeçam do topo
+    if st.session_state.get("feed_filtros") != filtros:
+        licitacoes, cursor = db.listar_licitacoes_pagina(filtros=filtros, limite=PAGINA_FEED)
+        st.session_state["feed_filtros"] = filtros
+        st.session_state["feed_licitacoes"] = licitacoes
+        st.session_state["feed_cursor"] = cursor
+
+    def carregar_mais():
+        """Acrescenta só a próxima página (as anteriores não são recarregadas)."""
+        pagina, cursor = db.listar_licitacoes_pagina(
+            filtros=st.session_state["feed_filtros"], limite=PAGINA_FEED,
+            cursor=st.session_state["feed_cursor"]
+        )
+        st.session_state["feed_licitacoes"] = st.session_state["feed_licitacoes"] + pagina
+        st.session_state["feed_cursor"] = cursor
+
+    licitacoes = st.session_state["feed_licitacoes"]
     
     if not licitacoes:
         st.markdown(
@@ -121,6 +144,15 @@ try:
                 
                 st.markdown("---")
 
+    # Carregar mais
+    if st.session_state["feed_cursor"]:
+        st.button(
+            f"⬇️ Carregar mais ({len(licitacoes)} carregadas)", on_click=carregar_mais,
+            width="stretch"
+        )
+    else:
+        st.caption(f"Fim do feed · {len(licitacoes)} licitações")
+
 except Exception as e:
     st.error("⚠️ Erro ao carregar feed.")
     with st.expander("Ver erro"):
@@ -184,7 +184,9 @@ try:
 
     # ---- Dados Brutos ----
     with st.expander("🔧 Dados brutos (JSON da API)"):
-        st.json(lic.get("dados_brutos", {}))
+        # Payload grande: só decodifica quando pedido
+        if st.checkbox("Carregar JSON", key=f"brutos_{lic_id}"):
+            st.json(lic.get("dados_brutos") or {})
 
 except Exception as e:
     st.error("⚠️ Erro ao carregar análise.")
@@ -23,6 +23,8 @@ st.markdown("# ⚙️ Perfis de Busca")
 try:
     from services import supabase_client as db
 
+    MODOS_MATCH = {"fuzzy": "🔤 Fuzzy", "vetorial": "🧮 Vetorial (TF-IDF)"}
+
     tab_perfis, tab_categorias, tab_novo = st.tabs(["📋 Perfis", "📁 Categorias", "➕ Novo Perfil"])
 
     # ---- TAB: Perfis existentes ----
@@ -59,6 +61,37 @@ try:
                             db.atualizar_buscar_hoje(perfil["id"], buscar)
                             st.rerun()
 
+                        modo_atual = perfil.get("modo_match") or "fuzzy"
+                        modo = st.selectbox(
+                            "Modo de match", list(MODOS_MATCH), index=list(MODOS_MATCH).index(modo_atual),
+                            format_func=MODOS_MATCH.get, key=f"modo_{perfil['id']}"
+                        )
+                        if modo != modo_atual:
+                            db.atualizar_perfil(perfil["id"], {"modo_match": modo})
+                            st.rerun()
+
+                        encerradas = st.checkbox(
+                            "Ignorar encerradas", value=bool(perfil.get("excluir_encerradas")),
+                            key=f"encerradas_{perfil['id']}",
+                            help="Descarta licitações encerradas, revogadas ou com prazo vencido"
+                        )
+                        if encerradas != bool(perfil.get("excluir_encerradas")):
+                            db.atualizar_perfil(perfil["id"], {"excluir_encerradas": encerradas})
+                            st.rerun()
+
+                    # Termos de exclusão (compara as listas: o texto digitado pode
+                    # diferir do salvo só na formatação)
+                    exclusao_salva = list(perfil.get("termos_exclusao") or [])
+                    exclusao = st.text_input(
+                        "🚫 Exceto (termos de exclusão, separados por vírgula)",
+                        value=", ".join(exclusao_salva), placeholder="ex: locação, manutenção",
+                        key=f"exclusao_{perfil['id']}"
+                    )
+                    termos_exclusao = [t.strip() for t in exclusao.split(",") if t.strip()]
+                    if termos_exclusao != exclusao_salva:
+                        db.atualizar_perfil(perfil["id"], {"termos_exclusao": termos_exclusao})
+                        st.rerun()
+
                     # Termos de busca
                     st.markdown("#### 📝 Termos de Busca")
                     termos = db.listar_termos(perfil["id"], apenas_ativos=False)
@@ -85,9 +118,25 @@ try:
                     )
                     if st.button("➕ Adicionar", key=f"add_termo_{perfil['id']}"):
                         if novo_termo.strip():
-                            db.adicionar_termo(perfil["id"], novo_termo.strip())
-                            st.success(f"Termo '{novo_termo}' adicionado! ✅")
+                            criados = db.adicionar_termo(perfil["id"], novo_termo.strip())
+                            # Backfill: casa o termo novo com as licitações que já temos
+                            with st.spinner("Procurando o termo nas licitações já baixadas..."):
+                                from services.search_engine import SearchEngine
+                                backfill = SearchEngine().backfill_termos(
+                                    perfil, criados or [], corpus=st.session_state.get("ultimo_corpus")
+                                )
+                            if backfill["vinculos"] or backfill["novas"]:
+                                st.session_state.pop("feed_filtros", None)  # Feed recarrega
+                            st.session_state[f"backfill_{perfil['id']}"] = (
+                                f"Termo '{novo_termo}' adicionado! ✅ "
+                                f"{backfill['encontradas']} de {backfill['analisadas']} licitações "
+                                f"já baixadas casariam · {backfill['vinculos']} vínculos novos"
+                            )
                             st.rerun()
+                    # Resultado do backfill (sobrevive ao rerun)
+                    msg_backfill = st.session_state.pop(f"backfill_{perfil['id']}", None)
+                    if msg_backfill:
+                        st.success(msg_backfill)
 
             st.markdown("---")
 
@@ -137,6 +186,14 @@ try:
         
         from services.api_client import UFS
         np_regioes = st.multiselect("Regiões (UF)", UFS, default=[])
+        np_modo = st.selectbox(
+            "Modo de match", list(MODOS_MATCH), format_func=MODOS_MATCH.get,
+            help="Vetorial: similaridade TF-IDF, mais rápida e precisa em objetos longos"
+        )
+        np_exclusao = st.text_input(
+            "🚫 Exceto (termos de exclusão, separados por vírgula)", placeholder="ex: locação"
+        )
+        np_encerradas = st.checkbox("Ignorar encerradas (situação ou prazo vencido)", value=False)
         
         np_termos = st.text_area(
             "Termos de busca (um por linha)",
@@ -152,7 +209,10 @@ try:
                     descricao=np_descricao,
                     valor_minimo=np_val_min if np_val_min > 0 else None,
                     valor_maximo=np_val_max if np_val_max > 0 else None,
-                    regioes=np_regioes or None
+                    regioes=np_regioes or None,
+                    modo_match=np_modo,
+                    termos_exclusao=[t.strip() for t in np_exclusao.split(",") if t.strip()],
+                    excluir_encerradas=np_encerradas
                 )
                 
                 # Adicionar termos
@@ -1,6 +1,9 @@
 -- ============================================
 -- LICITAFLIX — Schema Supabase
--- Execute no SQL Editor do Supabase
+-- Execute no SQL Editor do Supabase (ou python setup_db.py)
+-- Banco novo: este arquivo e depois migrations/ em ordem. Funções, índices
+-- e tudo que bancos já existentes precisam receber ficam em migrations/,
+-- aplicadas pelo setup_db.py
 -- ============================================
 
 -- Categorias agrupam perfis (ex: "Produtos", "Obras")
@@ -27,6 +30,9 @@ CREATE TABLE IF NOT EXISTS perfis_busca (
     buscar_hoje BOOLEAN DEFAULT TRUE,
     ultima_busca TIMESTAMPTZ,
     total_encontradas INT DEFAULT 0,
+    modo_match TEXT NOT NULL DEFAULT 'fuzzy' CHECK (modo_match IN ('fuzzy', 'vetorial')),
+    termos_exclusao TEXT[] DEFAULT '{}',         -- objeto com algum deles é descartado
+    excluir_encerradas BOOLEAN DEFAULT FALSE,    -- descarta situação encerrada / prazo vencido
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
@@ -111,6 +117,18 @@ CREATE TABLE IF NOT EXISTS termos_sugeridos (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Watermarks da sincronização incremental (última data vista por consulta)
+CREATE TABLE IF NOT EXISTS sync_watermarks (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    uf TEXT NOT NULL DEFAULT '',
+    modalidade INT NOT NULL DEFAULT 0,
+    ultima_data DATE,
+    shards_pendentes JSONB NOT NULL DEFAULT '[]',  -- [[inicio, fim], ...] que falharam
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(endpoint, uf, modalidade)
+);
+
 -- ============================================
 -- DADOS INICIAIS — Categorias e Perfis
 -- ============================================
@@ -226,6 +244,7 @@ ALTER TABLE licitacao_perfil ENABLE ROW LEVEL SECURITY;
 ALTER TABLE licitacao_status ENABLE ROW LEVEL SECURITY;
 ALTER TABLE historico_buscas ENABLE ROW LEVEL SECURITY;
 ALTER TABLE termos_sugeridos ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sync_watermarks ENABLE ROW LEVEL SECURITY;
 
 -- Políticas públicas (acesso total via anon key — app pessoal)
 CREATE POLICY "allow_all" ON categorias FOR ALL USING (true) WITH CHECK (true);
@@ -236,3 +255,4 @@ CREATE POLICY "allow_all" ON licitacao_perfil FOR ALL USING (true) WITH CHECK (t
 CREATE POLICY "allow_all" ON licitacao_status FOR ALL USING (true) WITH CHECK (true);
 CREATE POLICY "allow_all" ON historico_buscas FOR ALL USING (true) WITH CHECK (true);
 CREATE POLICY "allow_all" ON termos_sugeridos FOR ALL USING (true) WITH CHECK (true);
+CREATE POLICY "allow_all" ON sync_watermarks FOR ALL USING (true) WITH CHECK (true);
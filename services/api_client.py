@@ -3,14 +3,21 @@ Licitaflix — API Client
 Cliente para as APIs ComprasGov Dados Abertos e PNCP.
 """
 import requests
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 from typing import Optional
+from requests.adapters import HTTPAdapter
+from services.http_cache import CacheHTTP, obter_cache
+from services.licitacao import Licitacao
+from services.transporte import EstatisticasTransporte, Transporte, obter_transporte
 
 
 BASE_URL_COMPRAS = "https://dadosabertos.compras.gov.br"
 BASE_URL_PNCP = "https://pncp.gov.br/api/consulta"
 
+# Propostas abertas: considera encerramentos até N dias à frente
+HORIZONTE_PROPOSTAS_DIAS = 90
+
 # Códigos de modalidade (Lei 14.133/2021)
 MODALIDADES = {
     1: "Pregão Eletrônico",
@@ -35,45 +42,237 @@ UFS = [
 ]
 
 
-class ComprasGovClient:
+class NormalizadorComprasGov:
+    """Normalização dos registros do ComprasGov (padronizar campos)."""
+
+    def _normalizar_legado(self, raw: dict) -> Licitacao:
+        return Licitacao(
+            id_compra=raw.get("id_compra", ""),
+            numero_controle_pncp=None,
+            fonte="comprasgov_legado",
+            modalidade=raw.get("nome_modalidade", ""),
+            modalidade_codigo=raw.get("modalidade"),
+            objeto=raw.get("objeto", "") or "",
+            valor_estimado=raw.get("valor_estimado_total"),
+            valor_homologado=raw.get("valor_homologado_total"),
+            orgao=None,
+            uasg=str(raw.get("uasg", "")),
+            uf=None,
+            municipio=None,
+            situacao=raw.get("situacao_aviso", ""),
+            data_publicacao=raw.get("data_publicacao"),
+            data_abertura_proposta=raw.get("data_abertura_proposta"),
+            data_encerramento_proposta=None,
+            data_resultado=None,
+            numero_itens=raw.get("numero_itens"),
+            numero_processo=raw.get("numero_processo", ""),
+            srp=False,
+            dados_brutos=raw,
+        )
+
+    def _normalizar_pregao(self, raw: dict) -> Licitacao:
+        return Licitacao(
+            id_compra=raw.get("id_compra", ""),
+            numero_controle_pncp=None,
+            fonte="comprasgov_pregao",
+            modalidade="Pregão",
+            modalidade_codigo=None,
+            objeto=raw.get("tx_objeto", "") or "",
+            valor_estimado=self._parse_float(raw.get("vl_estimado_total")),
+            valor_homologado=self._parse_float(raw.get("vl_homologado_total")),
+            orgao=raw.get("no_orgao", ""),
+            uasg=str(raw.get("co_uasg", "")),
+            uf=None,
+            municipio=None,
+            situacao=raw.get("ds_situacao_pregao", ""),
+            data_publicacao=raw.get("dt_data_edital"),
+            data_abertura_proposta=raw.get("dt_inicio_proposta"),
+            data_encerramento_proposta=raw.get("dt_fim_proposta"),
+            data_resultado=raw.get("dt_resultado"),
+            numero_itens=None,
+            numero_processo=raw.get("co_processo", ""),
+            srp=False,
+            dados_brutos=raw,
+        )
+
+    def _normalizar_14133(self, raw: dict) -> Licitacao:
+        return Licitacao(
+            id_compra=raw.get("idCompra", ""),
+            numero_controle_pncp=raw.get("numeroControlePNCP", ""),
+            fonte="comprasgov_14133",
+            modalidade=raw.get("modalidadeNome", ""),
+            modalidade_codigo=raw.get("codigoModalidade"),
+            objeto=raw.get("objetoCompra", "") or "",
+            valor_estimado=raw.get("valorTotalEstimado"),
+            valor_homologado=raw.get("valorTotalHomologado"),
+            orgao=raw.get("orgaoEntidadeRazaoSocial", ""),
+            uasg=raw.get("unidadeOrgaoCodigoUnidade", ""),
+            uf=raw.get("unidadeOrgaoUfSigla", ""),
+            municipio=raw.get("unidadeOrgaoMunicipioNome", ""),
+            situacao=raw.get("situacaoCompraNomePncp", ""),
+            data_publicacao=self._extract_date(raw.get("dataPublicacaoPncp")),
+            data_abertura_proposta=raw.get("dataAberturaPropostaPncp"),
+            data_encerramento_proposta=raw.get("dataEncerramentoPropostaPncp"),
+            data_resultado=None,
+            numero_itens=None,
+            numero_processo=raw.get("processo", ""),
+            srp=raw.get("srp", False),
+            dados_brutos=raw,
+        )
+
+    def _parse_float(self, val):
+        if val is None:
+            return None
+        try:
+            return float(str(val).replace(",", "."))
+        except (ValueError, TypeError):
+            return None
+
+    def _extract_date(self, dt_str):
+        if not dt_str:
+            return None
+        return dt_str[:10] if len(dt_str) >= 10 else dt_str
+
+
+class NormalizadorPNCP(NormalizadorComprasGov):
+    """Normalização dos registros da API de consulta do PNCP."""
+
+    def _normalizar_pncp(self, raw: dict, fonte: str = "pncp_publicacao") -> Licitacao:
+        orgao = raw.get("orgaoEntidade") or {}
+        unidade = raw.get("unidadeOrgao") or {}
+        numero = raw.get("numeroControlePNCP", "")
+        return Licitacao(
+            id_compra=numero,
+            numero_controle_pncp=numero,
+            fonte=fonte,
+            modalidade=raw.get("modalidadeNome", ""),
+            modalidade_codigo=raw.get("modalidadeId"),
+            objeto=raw.get("objetoCompra", "") or "",
+            valor_estimado=raw.get("valorTotalEstimado"),
+            valor_homologado=raw.get("valorTotalHomologado"),
+            orgao=orgao.get("razaoSocial", ""),
+            uasg=unidade.get("codigoUnidade", ""),
+            uf=unidade.get("ufSigla", ""),
+            municipio=unidade.get("municipioNome", ""),
+            situacao=raw.get("situacaoCompraNome", ""),
+            data_publicacao=self._extract_date(raw.get("dataPublicacaoPncp")),
+            data_abertura_proposta=raw.get("dataAberturaProposta"),
+            data_encerramento_proposta=raw.get("dataEncerramentoProposta"),
+            data_resultado=None,
+            numero_itens=None,
+            numero_processo=raw.get("processo", ""),
+            srp=raw.get("srp", False),
+            dados_brutos=raw,
+        )
+
+    @staticmethod
+    def _paginas_restantes(data: dict) -> int:
+        """Páginas restantes a partir dos metadados de paginação do PNCP."""
+        if data.get("paginasRestantes") is not None:
+            return data["paginasRestantes"] or 0
+        total = data.get("totalPaginas") or 0
+        return max(0, total - (data.get("numeroPagina") or 1))
+
+    @staticmethod
+    def _data_pncp(data: str) -> str:
+        """O PNCP espera datas no formato AAAAMMDD."""
+        return str(data)[:10].replace("-", "")
+
+
+def iterar_fontes(clientes: list, consultas: list, max_pages: int = 2,
+                  stats: EstatisticasTransporte = None, dividir_acima: int = None):
+    """
+    Gerador síncrono de consultas de várias fontes (ComprasGov e PNCP) num
+    único event loop: ("pagina", i, registros) e ("fim", i, completo).
+
+    Cada consulta vai para o cliente cujas fontes incluem `consulta["fonte"]`.
+    `stats` recebe os contadores do transporte só destas consultas; com
+    `dividir_acima`, consultas grandes viram shards diários, cada um
+    encerrado com ("shard", i, ((inicio, fim), completo)).
+    """
+    from services.async_api_client import iterar_em_thread, iterar_multiplos
+
+    asyncs = [c._cliente_async(stats) for c in clientes]
+    yield from iterar_em_thread(iterar_multiplos(asyncs, consultas, max_pages, dividir_acima))
+    for cliente, cliente_async in zip(clientes, asyncs):
+        cliente.paginas_falhas.extend((e, p) for e, _, p in cliente_async.paginas_falhas)
+
+
+class ComprasGovClient(NormalizadorComprasGov):
     """Cliente para API dadosabertos.compras.gov.br"""
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 4, cache: CacheHTTP = None,
+                 transporte: Transporte = None):
         self.base_url = BASE_URL_COMPRAS
+        self.cache = cache or obter_cache()
+        self.transporte = transporte or obter_transporte()
+        self.max_workers = max_workers
         self.session = requests.Session()
         self.session.headers.update({"Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.paginas_falhas = []  # (endpoint, página) que falharam
+
+    def _get_pagina(self, endpoint: str, params: dict, pagina: int) -> Optional[dict]:
+        """Busca uma única página. Retorna o JSON ou None em caso de falha."""
+        url = f"{self.base_url}{endpoint}"
+        params = {**params, "pagina": pagina}
+        if self.cache:
+            data = self.cache.obter(url, params)
+            if data is not None:
+                return data
+            if self.cache.offline:
+                self.paginas_falhas.append((endpoint, pagina))
+                return None
+
+        try:
+            # Retries, Retry-After e circuit breaker ficam no transporte
+            resp = self.transporte.get(self.session, url, params)
+            if resp is None:
+                self.paginas_falhas.append((endpoint, pagina))
+                return None
+            if resp.status_code == 204:  # Sem conteúdo
+                return {}
+            data = resp.json()
+            if self.cache:
+                self.cache.salvar(url, params, resp.text)
+            return data
+        except Exception as e:
+            print(f"Erro API ComprasGov: {endpoint} página {pagina}: {e}")
+            self.paginas_falhas.append((endpoint, pagina))
+            return None
 
     def _get(self, endpoint: str, params: dict, max_pages: int = 5) -> list:
-        """Faz GET paginado e retorna todos os resultados."""
-        all_results = []
-        params.setdefault("pagina", 1)
+        """
+        Faz GET paginado e retorna todos os resultados (em ordem de página).
+
+        Lê a primeira página para descobrir `paginasRestantes` e busca as
+        demais em paralelo. Uma página com falha fica registrada em
+        `paginas_falhas`, sem descartar as páginas seguintes.
+        """
+        params = {**params}
         params.setdefault("tamanhoPagina", 50)
 
-        for page in range(max_pages):
-            params["pagina"] = page + 1
-            try:
-                resp = self.session.get(
-                    f"{self.base_url}{endpoint}",
-                    params=params,
-                    timeout=30
-                )
-                if resp.status_code != 200:
-                    break
-                data = resp.json()
-                resultado = data.get("resultado", [])
-                if not resultado:
-                    break
-                all_results.extend(resultado)
-
-                paginas_restantes = data.get("paginasRestantes", 0)
-                if paginas_restantes <= 0:
-                    break
-
-                time.sleep(0.5)  # Rate limiting
-            except Exception as e:
-                print(f"Erro API ComprasGov: {e}")
-                break
+        data = self._get_pagina(endpoint, params, 1)
+        if not data:
+            return []
+        resultado = data.get("resultado", [])
+        if not resultado:
+            return []
+
+        paginas_restantes = data.get("paginasRestantes", 0) or 0
+        ultima = min(max_pages, 1 + paginas_restantes)
+        if ultima <= 1:
+            return list(resultado)
 
+        paginas = list(range(2, ultima + 1))
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paginas))) as pool:
+            respostas = pool.map(lambda p: self._get_pagina(endpoint, params, p), paginas)
+
+        all_results = list(resultado)
+        for resp in respostas:
+            if resp:
+                all_results.extend(resp.get("resultado", []))
         return all_results
 
     def buscar_licitacoes_legado(
@@ -144,173 +343,120 @@ class ComprasGovClient:
         data_fim: str,
         uf: str = None,
         modalidades: list = None,
-        max_pages: int = 2
+        max_pages: int = 2,
+        ufs: list = None
     ) -> list:
-        """Busca em todas as modalidades da 14.133 (ou nas especificadas)."""
+        """
+        Busca em todas as modalidades da 14.133 (ou nas especificadas).
+
+        Wrapper síncrono do AsyncComprasGovClient: todas as combinações
+        UF × modalidade × página rodam concorrentemente num único event loop.
+        """
         if modalidades is None:
             modalidades = [1, 2, 6, 7]  # Pregão, Concorrência, Dispensa, Inexigibilidade
+        if ufs is None:
+            ufs = [uf]
 
-        todos = []
-        for mod in modalidades:
-            try:
-                resultados = self.buscar_contratacoes_14133(
-                    data_inicio, data_fim, mod, uf, max_pages
-                )
-                todos.extend(resultados)
-                time.sleep(0.3)
-            except Exception as e:
-                print(f"Erro modalidade {mod}: {e}")
-                continue
-        return todos
-
-    # ========================================
-    # Normalização (padronizar campos)
-    # ========================================
-
-    def _normalizar_legado(self, raw: dict) -> dict:
-        return {
-            "id_compra": raw.get("id_compra", ""),
-            "numero_controle_pncp": None,
-            "fonte": "comprasgov_legado",
-            "modalidade": raw.get("nome_modalidade", ""),
-            "modalidade_codigo": raw.get("modalidade"),
-            "objeto": raw.get("objeto", "") or "",
-            "valor_estimado": raw.get("valor_estimado_total"),
-            "valor_homologado": raw.get("valor_homologado_total"),
-            "orgao": None,
-            "uasg": str(raw.get("uasg", "")),
-            "uf": None,
-            "municipio": None,
-            "situacao": raw.get("situacao_aviso", ""),
-            "data_publicacao": raw.get("data_publicacao"),
-            "data_abertura_proposta": raw.get("data_abertura_proposta"),
-            "data_encerramento_proposta": None,
-            "data_resultado": None,
-            "numero_itens": raw.get("numero_itens"),
-            "numero_processo": raw.get("numero_processo", ""),
-            "srp": False,
-            "dados_brutos": raw,
-        }
+        consultas = [
+            {"fonte": "comprasgov_14133", "data_inicio": data_inicio, "data_fim": data_fim,
+             "uf": u, "modalidade": mod}
+            for u in ufs for mod in modalidades
+        ]
+        return [r for registros, _ in self.buscar_consultas(consultas, max_pages) for r in registros]
 
-    def _normalizar_pregao(self, raw: dict) -> dict:
-        return {
-            "id_compra": raw.get("id_compra", ""),
-            "numero_controle_pncp": None,
-            "fonte": "comprasgov_pregao",
-            "modalidade": "Pregão",
-            "modalidade_codigo": None,
-            "objeto": raw.get("tx_objeto", "") or "",
-            "valor_estimado": self._parse_float(raw.get("vl_estimado_total")),
-            "valor_homologado": self._parse_float(raw.get("vl_homologado_total")),
-            "orgao": raw.get("no_orgao", ""),
-            "uasg": str(raw.get("co_uasg", "")),
-            "uf": None,
-            "municipio": None,
-            "situacao": raw.get("ds_situacao_pregao", ""),
-            "data_publicacao": raw.get("dt_data_edital"),
-            "data_abertura_proposta": raw.get("dt_inicio_proposta"),
-            "data_encerramento_proposta": raw.get("dt_fim_proposta"),
-            "data_resultado": raw.get("dt_resultado"),
-            "numero_itens": None,
-            "numero_processo": raw.get("co_processo", ""),
-            "srp": False,
-            "dados_brutos": raw,
-        }
+    def buscar_consultas(self, consultas: list, max_pages: int = 2) -> list:
+        """
+        Executa várias consultas (fonte, janela, UF, modalidade) concorrentemente.
 
-    def _normalizar_14133(self, raw: dict) -> dict:
-        return {
-            "id_compra": raw.get("idCompra", ""),
-            "numero_controle_pncp": raw.get("numeroControlePNCP", ""),
-            "fonte": "comprasgov_14133",
-            "modalidade": raw.get("modalidadeNome", ""),
-            "modalidade_codigo": raw.get("codigoModalidade"),
-            "objeto": raw.get("objetoCompra", "") or "",
-            "valor_estimado": raw.get("valorTotalEstimado"),
-            "valor_homologado": raw.get("valorTotalHomologado"),
-            "orgao": raw.get("orgaoEntidadeRazaoSocial", ""),
-            "uasg": raw.get("unidadeOrgaoCodigoUnidade", ""),
-            "uf": raw.get("unidadeOrgaoUfSigla", ""),
-            "municipio": raw.get("unidadeOrgaoMunicipioNome", ""),
-            "situacao": raw.get("situacaoCompraNomePncp", ""),
-            "data_publicacao": self._extract_date(raw.get("dataPublicacaoPncp")),
-            "data_abertura_proposta": raw.get("dataAberturaPropostaPncp"),
-            "data_encerramento_proposta": raw.get("dataEncerramentoPropostaPncp"),
-            "data_resultado": None,
-            "numero_itens": None,
-            "numero_processo": raw.get("processo", ""),
-            "srp": raw.get("srp", False),
-            "dados_brutos": raw,
-        }
+        Returns:
+            lista alinhada com `consultas` de (registros normalizados, completo)
+        """
+        from services.async_api_client import executar
 
-    def _parse_float(self, val):
-        if val is None:
-            return None
-        try:
-            return float(str(val).replace(",", "."))
-        except (ValueError, TypeError):
-            return None
+        cliente = self._cliente_async()
+        resultados = executar(cliente.buscar_consultas(consultas, max_pages))
+        self.paginas_falhas.extend((e, p) for e, _, p in cliente.paginas_falhas)
+        return resultados
+
+    def iterar_consultas(self, consultas: list, max_pages: int = 2):
+        """
+        Gerador com os mesmos dados de `buscar_consultas`, entregues conforme
+        as páginas chegam: ("pagina", i, registros) e ("fim", i, completo).
+        """
+        yield from iterar_fontes([self], consultas, max_pages)
+
+    def _cliente_async(self, stats: EstatisticasTransporte = None):
+        from services.async_api_client import AsyncComprasGovClient
+
+        return AsyncComprasGovClient(
+            max_concorrencia=self.max_workers * 2, cache=self.cache,
+            transporte=self.transporte, stats=stats,
+        )
 
-    def _extract_date(self, dt_str):
-        if not dt_str:
-            return None
-        return dt_str[:10] if len(dt_str) >= 10 else dt_str
 
+class PNCPClient(NormalizadorPNCP):
+    """
+    Cliente para API pncp.gov.br/api/consulta
 
-class PNCPClient:
-    """Cliente para API pncp.gov.br/api/consulta"""
+    Wrapper síncrono do AsyncPNCPClient: as consultas e suas páginas rodam
+    concorrentemente num único event loop.
+    """
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 4, cache: CacheHTTP = None,
+                 transporte: Transporte = None):
         self.base_url = BASE_URL_PNCP
-        self.session = requests.Session()
-        self.session.headers.update({"Accept": "application/json"})
+        self.cache = cache or obter_cache()
+        self.transporte = transporte or obter_transporte()
+        self.max_workers = max_workers
+        self.paginas_falhas = []  # (endpoint, página) que falharam
 
     def buscar_contratacoes_por_publicacao(
         self,
         data_inicio: str,
         data_fim: str,
-        pagina: int = 1,
-        tam_pagina: int = 50
+        modalidade: int = 1,
+        uf: str = None,
+        max_pages: int = 3
     ) -> list:
-        """Busca contratações por data de publicação no PNCP."""
-        try:
-            resp = self.session.get(
-                f"{self.base_url}/v1/contratacoes/publicacao",
-                params={
-                    "dataInicial": data_inicio,
-                    "dataFinal": data_fim,
-                    "pagina": pagina,
-                    "tamanhoPagina": tam_pagina
-                },
-                timeout=30
-            )
-            if resp.status_code == 200:
-                data = resp.json()
-                return data if isinstance(data, list) else data.get("data", [])
-        except Exception as e:
-            print(f"Erro API PNCP: {e}")
-        return []
+        """Busca contratações por data de publicação no PNCP (modalidade obrigatória)."""
+        consulta = {"fonte": "pncp_publicacao", "data_inicio": data_inicio, "data_fim": data_fim,
+                    "uf": uf, "modalidade": modalidade}
+        (registros, _), = self.buscar_consultas([consulta], max_pages)
+        return registros
 
     def buscar_contratacoes_propostas_abertas(
         self,
-        data_inicio: str,
         data_fim: str,
-        pagina: int = 1
+        modalidade: int = None,
+        uf: str = None,
+        max_pages: int = 3
     ) -> list:
-        """Busca contratações com propostas ainda abertas."""
-        try:
-            resp = self.session.get(
-                f"{self.base_url}/v1/contratacoes/proposta",
-                params={
-                    "dataInicial": data_inicio,
-                    "dataFinal": data_fim,
-                    "pagina": pagina,
-                    "tamanhoPagina": 50
-                },
-                timeout=30
-            )
-            if resp.status_code == 200:
-                data = resp.json()
-                return data if isinstance(data, list) else data.get("data", [])
-        except Exception as e:
-            print(f"Erro API PNCP propostas: {e}")
-        return []
+        """
+        Busca contratações com recebimento de propostas ainda aberto e
+        encerramento até `data_fim`.
+        """
+        consulta = {"fonte": "pncp_propostas", "data_inicio": None, "data_fim": data_fim,
+                    "uf": uf, "modalidade": modalidade}
+        (registros, _), = self.buscar_consultas([consulta], max_pages)
+        return registros
+
+    def buscar_consultas(self, consultas: list, max_pages: int = 2) -> list:
+        """Executa várias consultas concorrentemente (ver `ComprasGovClient.buscar_consultas`)."""
+        from services.async_api_client import executar
+
+        cliente = self._cliente_async()
+        resultados = executar(cliente.buscar_consultas(consultas, max_pages))
+        self.paginas_falhas.extend((e, p) for e, _, p in cliente.paginas_falhas)
+        return resultados
+
+    def iterar_consultas(self, consultas: list, max_pages: int = 2):
+        """Gerador de eventos por página (ver `iterar_fontes`)."""
+        yield from iterar_fontes([self], consultas, max_pages)
+
+    def _cliente_async(self, stats: EstatisticasTransporte = None):
+        from services.async_api_client import AsyncPNCPClient
+
+        return AsyncPNCPClient(
+            max_concorrencia=self.max_workers * 2, cache=self.cache,
+            transporte=self.transporte, stats=stats,
+        )
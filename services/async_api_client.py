@@ -0,0 +1,535 @@
+"""
+Licitaflix — Async API Client
+Clientes assíncronos (httpx) para ComprasGov e PNCP.
+
+Todas as requisições (UF × modalidade × página) rodam num único event loop,
+sob um limite global de concorrência.
+"""
+import asyncio
+from contextlib import aclosing
+from typing import Optional
+
+import httpx
+
+from services.api_client import (
+    BASE_URL_COMPRAS, BASE_URL_PNCP, NormalizadorComprasGov, NormalizadorPNCP
+)
+from services.http_cache import CacheHTTP, obter_cache
+from services.incremental import planejar_shards
+from services.licitacao import Licitacao
+from services.transporte import EstatisticasTransporte, Transporte, obter_transporte
+
+
+LIMITE_PAGINAS = 500  # Teto de segurança por consulta quando max_pages=None
+
+
+class _AsyncPaginador:
+    """Base: paginação assíncrona com concorrência limitada."""
+
+    base_url = ""
+    nome = ""
+    fontes = {}  # fonte -> (endpoint, campo data inicial, campo data final)
+
+    def __init__(self, max_concorrencia: int = 8, cache: CacheHTTP = None,
+                 transporte: Transporte = None, stats: EstatisticasTransporte = None):
+        self.max_concorrencia = max_concorrencia
+        self.cache = cache or obter_cache()
+        self.transporte = transporte or obter_transporte()
+        self.stats = stats  # Contadores da busca que usa este cliente (opcional)
+        self.paginas_falhas = []  # (endpoint, params, página) que falharam
+
+    def _extrair(self, data) -> tuple:
+        """Retorna (registros, páginas restantes) de uma resposta."""
+        raise NotImplementedError
+
+    def _requisicao(self, consulta: dict) -> tuple:
+        """Converte uma consulta (fonte, janela, UF, modalidade) em (endpoint, params)."""
+        raise NotImplementedError
+
+    def _normalizar(self, fonte: str, raw: dict) -> Licitacao:
+        raise NotImplementedError
+
+    def _novo_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers={"Accept": "application/json"},
+            timeout=30,
+            limits=httpx.Limits(
+                max_connections=self.max_concorrencia,
+                max_keepalive_connections=self.max_concorrencia,
+            ),
+        )
+
+    async def _get_pagina(self, client: httpx.AsyncClient, endpoint: str,
+                          params: dict, pagina: int) -> Optional[tuple]:
+        url = f"{self.base_url}{endpoint}"
+        params_pagina = {**params, "pagina": pagina}
+        if self.cache:
+            data = self.cache.obter(url, params_pagina)
+            if data is not None:
+                return self._extrair(data)
+            if self.cache.offline:
+                self.paginas_falhas.append((endpoint, params, pagina))
+                return None
+
+        try:
+            # Limite de taxa, concorrência adaptativa e retries ficam no transporte
+            resp = await self.transporte.aget(client, url, params_pagina, self.stats)
+            if resp is None:
+                self.paginas_falhas.append((endpoint, params, pagina))
+                return None
+            if resp.status_code == 204:  # Sem conteúdo
+                return self._extrair({})
+            data = resp.json()
+            if self.cache:
+                # Escrita (commit) fora do event loop
+                await asyncio.to_thread(self.cache.salvar, url, params_pagina, resp.text)
+            return self._extrair(data)
+        except Exception as e:
+            print(f"Erro API {self.nome}: {endpoint} página {pagina}: {e}")
+            self.paginas_falhas.append((endpoint, params, pagina))
+            return None
+
+    async def _paginas(self, client: httpx.AsyncClient, indice: int, endpoint: str,
+                       params: dict, max_pages: int, fila: asyncio.Queue, converter=None,
+                       dividir=None):
+        """
+        Busca as páginas de uma consulta (página 1 primeiro, demais em
+        paralelo) e publica cada uma na fila assim que chega, já passada por
+        `converter(indice, registros)` (ex.: normalização), se dado.
+
+        Eventos: ("pagina", indice, página, registros) e, ao final,
+        ("fim", indice, completo) — completo é False se alguma página falhou,
+        se o resultado foi truncado por max_pages / LIMITE_PAGINAS ou se a
+        consulta levantou um erro (que não derruba as demais).
+
+        Com `dividir(indice, paginas)`, uma consulta grande demais (segundo a
+        página 1) é trocada pelos shards que ele devolver — [(janela,
+        endpoint, params)] —, cada um paginado e encerrado com
+        ("shard", indice, (janela, completo)) antes do "fim" da consulta.
+        """
+        completo = await self._completo(
+            self._baixar_paginas(client, indice, endpoint, params, max_pages, fila,
+                                 converter, dividir),
+            endpoint, params,
+        )
+        await fila.put(("fim", indice, completo))
+
+    async def _completo(self, download, endpoint: str, params: dict) -> bool:
+        """Aguarda um download; um erro nele só o deixa incompleto."""
+        try:
+            return await download
+        except Exception as e:
+            print(f"Erro API {self.nome}: {endpoint} {params}: {e}")
+            return False
+
+    async def _baixar_paginas(self, client: httpx.AsyncClient, indice: int, endpoint: str,
+                              params: dict, max_pages: int, fila: asyncio.Queue,
+                              converter=None, dividir=None) -> bool:
+        """Corpo de `_paginas`; retorna se a consulta veio completa."""
+        async def publicar(p: int, registros: list):
+            if converter:
+                registros = converter(indice, registros)
+            await fila.put(("pagina", indice, p, registros))
+
+        primeira = await self._get_pagina(client, endpoint, params, 1)
+        if not primeira:
+            return False
+        resultado, restantes = primeira
+        partes = dividir(indice, 1 + restantes) if dividir and resultado else []
+        if partes:
+            return await self._baixar_partes(client, indice, partes, max_pages, fila, converter)
+        if resultado:
+            await publicar(1, resultado)
+        # max_pages=None: até esgotar (com um teto de segurança)
+        ultima = min(max_pages or LIMITE_PAGINAS, 1 + restantes) if resultado else 1
+
+        async def pagina(p: int) -> bool:
+            resp = await self._get_pagina(client, endpoint, params, p)
+            if resp is None:
+                return False
+            await publicar(p, resp[0])
+            return True
+
+        # return_exceptions: um erro numa página não deixa as outras publicando soltas
+        oks = await asyncio.gather(*[pagina(p) for p in range(2, ultima + 1)],
+                                   return_exceptions=True)
+        for ok in oks:
+            if isinstance(ok, Exception):
+                raise ok
+        completo = not resultado or ultima == 1 + restantes
+        return completo and all(oks)
+
+    async def _baixar_partes(self, client: httpx.AsyncClient, indice: int, partes: list,
+                             max_pages: int, fila: asyncio.Queue, converter=None) -> bool:
+        """Pagina os shards de uma consulta dividida; retorna se todos vieram completos."""
+        async def parte(janela: tuple, endpoint: str, params: dict) -> bool:
+            completo = await self._completo(
+                self._baixar_paginas(client, indice, endpoint, params, max_pages, fila, converter),
+                endpoint, params,
+            )
+            await fila.put(("shard", indice, (janela, completo)))
+            return completo
+
+        return all(await asyncio.gather(*(parte(*p) for p in partes)))
+
+    async def _iterar(self, requisicoes: list, max_pages: int, converter=None, dividir=None):
+        """Gerador assíncrono de eventos de várias consultas (endpoint, params)."""
+        # Fila limitada: se o consumidor atrasa, as páginas seguintes esperam
+        fila = asyncio.Queue(maxsize=self.max_concorrencia * 2)
+        async with self._novo_client() as client:
+            tarefas = [
+                asyncio.create_task(
+                    self._paginas(client, i, endpoint, params, max_pages, fila, converter, dividir)
+                )
+                for i, (endpoint, params) in enumerate(requisicoes)
+            ]
+            try:
+                pendentes = len(tarefas)
+                while pendentes:
+                    evento = await fila.get()
+                    if evento[0] == "fim":
+                        pendentes -= 1
+                    yield evento
+            finally:
+                for t in tarefas:
+                    t.cancel()
+                await asyncio.gather(*tarefas, return_exceptions=True)
+
+    async def _get_lote(self, requisicoes: list, max_pages: int, converter=None) -> list:
+        """
+        Executa várias consultas (endpoint, params) num único client.
+
+        Returns:
+            lista alinhada de (registros em ordem de página, completo)
+        """
+        paginas = [dict() for _ in requisicoes]
+        completos = [False] * len(requisicoes)
+        async for evento in self._iterar(requisicoes, max_pages, converter):
+            if evento[0] == "pagina":
+                _, i, p, registros = evento
+                paginas[i][p] = registros
+            elif evento[0] == "fim":
+                completos[evento[1]] = evento[2]
+        return [
+            ([r for p in sorted(pags) for r in pags[p]], completo)
+            for pags, completo in zip(paginas, completos)
+        ]
+
+    async def buscar_consultas(self, consultas: list, max_pages: int = 2) -> list:
+        """
+        Executa várias consultas concorrentemente.
+
+        Args:
+            consultas: dicts com fonte, data_inicio, data_fim e, nas fontes
+                filtráveis, uf/modalidade
+            max_pages: limite de páginas por consulta (None = até esgotar)
+
+        Returns:
+            lista alinhada com `consultas` de (registros normalizados, completo)
+        """
+        return await self._get_lote(
+            [self._requisicao(c) for c in consultas], max_pages, self._normalizador(consultas)
+        )
+
+    async def iterar_consultas(self, consultas: list, max_pages: int = 2,
+                               dividir_acima: int = None):
+        """
+        Versão em streaming de `buscar_consultas`: gera eventos conforme as
+        páginas chegam — ("pagina", i, registros normalizados) e
+        ("fim", i, completo) para a consulta i.
+
+        Um erro numa consulta (rede, registro que não normaliza) só a encerra
+        com completo=False; as demais seguem.
+
+        Com `dividir_acima`, a consulta cuja página 1 indica mais páginas que
+        isso é refeita em shards diários, cada um encerrado com
+        ("shard", i, ((inicio, fim), completo)).
+        """
+        dividir = self._divisor(consultas, dividir_acima) if dividir_acima else None
+        async for evento in self._iterar(
+            [self._requisicao(c) for c in consultas], max_pages,
+            self._normalizador(consultas), dividir,
+        ):
+            if evento[0] == "pagina":
+                _, i, _, registros = evento
+                yield ("pagina", i, registros)
+            else:
+                yield evento
+
+    def _divisor(self, consultas: list, acima: int):
+        """
+        `dividir` de `_paginas`: shards diários da janela de uma consulta com
+        mais de `acima` páginas. Fontes sem data inicial (retrato do momento)
+        e janelas de um dia não se dividem.
+        """
+        def dividir(i: int, paginas: int) -> list:
+            c = consultas[i]
+            if (paginas <= acima or not self.fontes[c["fonte"]][1]
+                    or not c.get("data_inicio") or c["data_inicio"] >= c["data_fim"]):
+                return []
+            return [
+                ((ini, fim), *self._requisicao({**c, "data_inicio": ini, "data_fim": fim}))
+                for ini, fim in planejar_shards(c["data_inicio"], c["data_fim"])
+            ]
+        return dividir
+
+    def _normalizador(self, consultas: list):
+        """Converter de `_paginas`: normaliza os registros conforme a fonte da consulta."""
+        def normalizar(i: int, registros: list) -> list:
+            fonte = consultas[i]["fonte"]
+            return [self._normalizar(fonte, r) for r in registros]
+        return normalizar
+
+
+# Endpoint e parâmetros de cada fonte do ComprasGov
+FONTES_COMPRASGOV = {
+    "comprasgov_14133": (
+        "/modulo-contratacoes/1_consultarContratacoes_PNCP_14133",
+        "dataPublicacaoPncpInicial", "dataPublicacaoPncpFinal",
+    ),
+    "comprasgov_pregao": (
+        "/modulo-legado/3_consultarPregoes",
+        "dt_data_edital_inicial", "dt_data_edital_final",
+    ),
+    "comprasgov_legado": (
+        "/modulo-legado/1_consultarLicitacao",
+        "data_publicacao_inicial", "data_publicacao_final",
+    ),
+}
+
+
+class AsyncComprasGovClient(_AsyncPaginador, NormalizadorComprasGov):
+    """Cliente assíncrono para API dadosabertos.compras.gov.br"""
+
+    base_url = BASE_URL_COMPRAS
+    nome = "ComprasGov"
+    fontes = FONTES_COMPRASGOV
+
+    def _extrair(self, data) -> tuple:
+        return data.get("resultado", []) or [], data.get("paginasRestantes", 0) or 0
+
+    def _requisicao(self, consulta: dict, tamanho_pagina: int = 50) -> tuple:
+        fonte = consulta["fonte"]
+        endpoint, campo_inicio, campo_fim = FONTES_COMPRASGOV[fonte]
+        params = {
+            campo_inicio: consulta["data_inicio"],
+            campo_fim: consulta["data_fim"],
+            "tamanhoPagina": tamanho_pagina,
+        }
+        if fonte == "comprasgov_14133":
+            params["codigoModalidade"] = consulta.get("modalidade") or 1
+            if consulta.get("uf"):
+                params["unidadeOrgaoUfSigla"] = consulta["uf"]
+        return endpoint, params
+
+    def _normalizar(self, fonte: str, raw: dict) -> Licitacao:
+        if fonte == "comprasgov_14133":
+            return self._normalizar_14133(raw)
+        if fonte == "comprasgov_pregao":
+            return self._normalizar_pregao(raw)
+        return self._normalizar_legado(raw)
+
+    async def buscar_contratacoes_14133(
+        self,
+        data_inicio: str,
+        data_fim: str,
+        ufs: list = None,
+        modalidades: list = None,
+        max_pages: int = 2
+    ) -> list:
+        """Busca contratações da 14.133 para cada combinação UF × modalidade."""
+        if modalidades is None:
+            modalidades = [1, 2, 6, 7]  # Pregão, Concorrência, Dispensa, Inexigibilidade
+
+        consultas = [
+            {"fonte": "comprasgov_14133", "data_inicio": data_inicio, "data_fim": data_fim,
+             "uf": uf, "modalidade": mod}
+            for uf in (ufs or [None]) for mod in modalidades
+        ]
+        lotes = await self.buscar_consultas(consultas, max_pages)
+        return [r for registros, _ in lotes for r in registros]
+
+    async def buscar_pregoes(self, data_inicio: str, data_fim: str, max_pages: int = 3) -> list:
+        """Busca pregões no módulo legado."""
+        consulta = {"fonte": "comprasgov_pregao", "data_inicio": data_inicio, "data_fim": data_fim}
+        (registros, _), = await self.buscar_consultas([consulta], max_pages)
+        return registros
+
+    async def buscar_licitacoes_legado(self, data_inicio: str, data_fim: str,
+                                       max_pages: int = 3) -> list:
+        """Busca licitações no módulo legado (Lei 8.666)."""
+        consulta = {"fonte": "comprasgov_legado", "data_inicio": data_inicio, "data_fim": data_fim}
+        (registros, _), = await self.buscar_consultas([consulta], max_pages)
+        return registros
+
+
+# Endpoint e parâmetros de cada fonte do PNCP
+FONTES_PNCP = {
+    "pncp_propostas": ("/v1/contratacoes/proposta", None, "dataFinal"),
+    "pncp_publicacao": ("/v1/contratacoes/publicacao", "dataInicial", "dataFinal"),
+}
+
+
+class AsyncPNCPClient(_AsyncPaginador, NormalizadorPNCP):
+    """Cliente assíncrono para API pncp.gov.br/api/consulta"""
+
+    base_url = BASE_URL_PNCP
+    nome = "PNCP"
+    fontes = FONTES_PNCP
+
+    def _extrair(self, data) -> tuple:
+        if isinstance(data, list):
+            return data, 0
+        return data.get("data", []) or [], self._paginas_restantes(data)
+
+    def _requisicao(self, consulta: dict, tamanho_pagina: int = 50) -> tuple:
+        endpoint, campo_inicio, campo_fim = FONTES_PNCP[consulta["fonte"]]
+        params = {campo_fim: self._data_pncp(consulta["data_fim"]), "tamanhoPagina": tamanho_pagina}
+        if campo_inicio:
+            params[campo_inicio] = self._data_pncp(consulta["data_inicio"])
+        # Modalidade é obrigatória na consulta por publicação
+        modalidade = consulta.get("modalidade")
+        if modalidade or consulta["fonte"] == "pncp_publicacao":
+            params["codigoModalidadeContratacao"] = modalidade or 1
+        if consulta.get("uf"):
+            params["uf"] = consulta["uf"]
+        return endpoint, params
+
+    def _normalizar(self, fonte: str, raw: dict) -> Licitacao:
+        return self._normalizar_pncp(raw, fonte)
+
+    def _consultas(self, fonte: str, data_inicio: str, data_fim: str,
+                   ufs: list, modalidades: list) -> list:
+        return [
+            {"fonte": fonte, "data_inicio": data_inicio, "data_fim": data_fim,
+             "uf": uf, "modalidade": mod}
+            for uf in (ufs or [None]) for mod in (modalidades or [None])
+        ]
+
+    async def buscar_contratacoes_por_publicacao(
+        self,
+        data_inicio: str,
+        data_fim: str,
+        ufs: list = None,
+        modalidades: list = None,
+        max_pages: int = 3
+    ) -> list:
+        """Busca contratações por data de publicação (UF × modalidade)."""
+        if modalidades is None:
+            modalidades = [1, 2, 6, 7]  # Pregão, Concorrência, Dispensa, Inexigibilidade
+        consultas = self._consultas("pncp_publicacao", data_inicio, data_fim, ufs, modalidades)
+        lotes = await self.buscar_consultas(consultas, max_pages)
+        return [r for registros, _ in lotes for r in registros]
+
+    async def buscar_contratacoes_propostas_abertas(
+        self,
+        data_fim: str,
+        ufs: list = None,
+        modalidades: list = None,
+        max_pages: int = 3
+    ) -> list:
+        """Busca contratações com propostas ainda abertas (UF × modalidade)."""
+        consultas = self._consultas("pncp_propostas", data_fim, data_fim, ufs, modalidades)
+        lotes = await self.buscar_consultas(consultas, max_pages)
+        return [r for registros, _ in lotes for r in registros]
+
+
+async def iterar_multiplos(clientes: list, consultas: list, max_pages: int = 2,
+                           dividir_acima: int = None):
+    """
+    Intercala os eventos de vários clientes (ex.: ComprasGov e PNCP) num só
+    gerador, com os índices relativos à lista `consultas` original.
+    """
+    grupos = []
+    for cliente in clientes:
+        indices = [i for i, c in enumerate(consultas) if c["fonte"] in cliente.fontes]
+        if indices:
+            grupos.append((cliente, indices))
+
+    fila = asyncio.Queue(maxsize=8)
+    FIM = object()
+
+    async def consumir(cliente, indices):
+        try:
+            async with aclosing(cliente.iterar_consultas(
+                    [consultas[i] for i in indices], max_pages, dividir_acima)) as eventos:
+                async for evento in eventos:
+                    await fila.put((evento[0], indices[evento[1]], evento[2]))
+            await fila.put(FIM)
+        except Exception as e:
+            await fila.put(e)
+
+    tarefas = [asyncio.create_task(consumir(c, indices)) for c, indices in grupos]
+    try:
+        pendentes = len(tarefas)
+        while pendentes:
+            evento = await fila.get()
+            if evento is FIM:
+                pendentes -= 1
+                continue
+            if isinstance(evento, Exception):
+                raise evento
+            yield evento
+    finally:
+        for t in tarefas:
+            t.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+def iterar_em_thread(agen, buffer: int = 8):
+    """
+    Consome um gerador assíncrono a partir de código síncrono.
+
+    O event loop roda numa thread própria e entrega os itens por uma fila
+    limitada (`buffer`), que segura o download quando o consumidor atrasa.
+    """
+    import queue
+    import threading
+
+    fila = queue.Queue(maxsize=buffer)
+    parar = threading.Event()
+    FIM = object()
+
+    async def produzir():
+        loop = asyncio.get_running_loop()
+        try:
+            async for item in agen:
+                if parar.is_set():
+                    break
+                await loop.run_in_executor(None, fila.put, item)
+        except Exception as e:
+            await loop.run_in_executor(None, fila.put, e)
+        finally:
+            await agen.aclose()
+            await loop.run_in_executor(None, fila.put, FIM)
+
+    thread = threading.Thread(target=asyncio.run, args=(produzir(),), daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is FIM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        parar.set()
+        # Libera o produtor caso esteja bloqueado na fila cheia
+        while thread.is_alive():
+            try:
+                fila.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def executar(coro):
+    """Executa uma corrotina a partir de código síncrono (ex.: páginas Streamlit)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Já existe um loop rodando nesta thread: executa em outra thread
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
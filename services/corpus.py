@@ -0,0 +1,61 @@
+"""
+Licitaflix — Corpus
+Licitações baixadas uma única vez por execução, compartilhadas entre perfis.
+"""
+
+# Fontes consultadas por UF × modalidade (as demais são nacionais, sem filtro)
+FONTES_FILTRAVEIS = {"comprasgov_14133", "pncp_propostas", "pncp_publicacao"}
+
+MODALIDADES_PADRAO = [1, 2, 6, 7]  # Pregão, Concorrência, Dispensa, Inexigibilidade
+
+
+def escopo_perfis(perfis: list) -> list:
+    """
+    Pares (UF, modalidade) que cobrem vários perfis, sem redundância.
+
+    Cada perfil contribui só com as suas combinações (não o produto da
+    união de UFs × união de modalidades). Uma modalidade buscada
+    nacionalmente por algum perfil já cobre as UFs dos demais nela.
+
+    Returns:
+        lista de (uf, modalidade) — UF `None` indica busca nacional; os
+        nacionais primeiro, depois as UFs em ordem.
+    """
+    nacionais = set()
+    por_uf = set()
+    for perfil in perfis:
+        mods = perfil.get("modalidades") or MODALIDADES_PADRAO
+        regioes = perfil.get("regioes") or []
+        if regioes:
+            por_uf.update((uf, mod) for uf in regioes for mod in mods)
+        else:
+            nacionais.update(mods)
+
+    pares = {(None, mod) for mod in nacionais}
+    pares.update((uf, mod) for uf, mod in por_uf if mod not in nacionais)
+    return sorted(pares, key=lambda par: (par[0] or "", par[1]))
+
+
+def no_escopo(lic, regioes=None, modalidades=None) -> bool:
+    """
+    Se a licitação está na fatia de um perfil (regiões/modalidades).
+    UF ou modalidade não informadas não excluem.
+    """
+    if lic.get("fonte") not in FONTES_FILTRAVEIS:
+        return True
+    mod = lic.get("modalidade_codigo")
+    if mod is not None and mod not in set(modalidades or MODALIDADES_PADRAO):
+        return False
+    uf = lic.get("uf") or None
+    return not regioes or uf is None or uf in set(regioes)
+
+
+class Corpus:
+    """Licitações de uma execução; cada perfil filtra a sua parte com `no_escopo`."""
+
+    def __init__(self, licitacoes: list):
+        self.licitacoes = licitacoes
+        self.estatisticas = {}  # Estatísticas da consulta às APIs que gerou o corpus
+
+    def __len__(self):
+        return len(self.licitacoes)
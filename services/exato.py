@@ -0,0 +1,91 @@
+"""
+Licitaflix — Match exato
+Passada exata multi-padrão: todos os termos ativos de todos os perfis num
+único autômato Aho-Corasick. Cada objeto normalizado é varrido uma vez; um
+termo que aparece inteiro (palavras completas) já é match com SCORE_EXATO,
+sem passar pelo scoring fuzzy.
+"""
+import threading
+
+from services.normalizacao import normalizar_termo
+
+try:
+    import ahocorasick
+    AHOCORASICK_DISPONIVEL = True
+except ImportError:  # Sem pyahocorasick: tudo segue para o fuzzy
+    AHOCORASICK_DISPONIVEL = False
+
+
+def _padrao(texto: str) -> str:
+    """Forma de busca: tokens normalizados entre espaços (casa palavras inteiras)."""
+    return f" {normalizar_termo(texto)} "
+
+
+class MatcherExato:
+    """Autômato dos termos; `buscar(texto)` → {perfil_id: (termo_id, termo)}."""
+
+    def __init__(self, entradas: list):
+        """
+        Args:
+            entradas: (perfil_id, termo_id, termo) na ordem de prioridade —
+                se vários termos de um perfil aparecem, vence o primeiro
+        """
+        self._automato = None
+        if not AHOCORASICK_DISPONIVEL:
+            return
+        self._automato = ahocorasick.Automaton()
+        padroes = {}
+        for ordem, (perfil_id, termo_id, termo) in enumerate(entradas):
+            padrao = _padrao(termo)
+            if padrao.strip():
+                padroes.setdefault(padrao, []).append((ordem, perfil_id, termo_id, termo))
+        for padrao, alvos in padroes.items():
+            self._automato.add_word(padrao, alvos)
+        if padroes:
+            self._automato.make_automaton()
+        else:
+            self._automato = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._automato is not None
+
+    def buscar(self, texto: str) -> dict:
+        """
+        Termos que aparecem inteiros no objeto, por perfil.
+
+        Args:
+            texto: objeto já normalizado (`TextoNormalizado.texto`)
+        """
+        if self._automato is None:
+            return {}
+        melhores = {}
+        for _, alvos in self._automato.iter(f" {texto} "):
+            for ordem, perfil_id, termo_id, termo in alvos:
+                if perfil_id not in melhores or ordem < melhores[perfil_id][0]:
+                    melhores[perfil_id] = (ordem, termo_id, termo)
+        return {p: (termo_id, termo) for p, (_, termo_id, termo) in melhores.items()}
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def obter_matcher(perfis: list) -> MatcherExato:
+    """
+    Autômato dos termos ativos dos perfis, compilado uma vez e reaproveitado
+    enquanto os termos (texto, id, perfil) não mudarem.
+    """
+    entradas = tuple(
+        (perfil["id"], t.get("id"), t["termo"])
+        for perfil in perfis
+        for t in perfil.get("termos_busca", [])
+        if t.get("ativo", True)
+    )
+    with _cache_lock:
+        matcher = _cache.get(entradas)
+        if matcher is None:
+            if len(_cache) >= 8:
+                _cache.clear()
+            matcher = _cache[entradas] = MatcherExato(list(entradas))
+        return matcher
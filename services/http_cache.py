@@ -0,0 +1,178 @@
+"""
+Licitaflix — HTTP Cache
+Cache em disco (SQLite) das respostas das APIs, chaveado por endpoint + parâmetros.
+
+Janelas de datas totalmente no passado raramente mudam e ficam em cache por
+bastante tempo; janelas que incluem hoje expiram rápido. Com
+LICITAFLIX_OFFLINE=1 a busca roda só com o que já está em cache.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Optional
+
+TTL_PASSADO = 30 * 24 * 3600  # Janela fechada: 30 dias
+TTL_HOJE = 15 * 60            # Janela que inclui hoje: 15 minutos
+MAX_BYTES = 256 * 1024 * 1024  # Tamanho máximo do cache (LRU acima disso)
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(__file__), "..", ".cache", "http_cache.sqlite")
+
+_RE_DATA = re.compile(r"^(\d{4})-?(\d{2})-?(\d{2})")
+
+
+def _data_param(valor) -> Optional[date]:
+    """Interpreta um parâmetro como data (YYYY-MM-DD ou YYYYMMDD)."""
+    m = _RE_DATA.match(str(valor))
+    if not m:
+        return None
+    try:
+        return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+
+class CacheHTTP:
+    """
+    Cache de respostas HTTP com TTL por janela de datas e despejo LRU.
+
+    O tamanho total fica em memória; os acessos dos hits são gravados em
+    lote junto com a próxima escrita, e a limpeza dos expirados roda no
+    máximo a cada INTERVALO_DESPEJO segundos (ou quando passa de max_bytes).
+    """
+
+    INTERVALO_DESPEJO = 60   # Segundos entre limpezas dos expirados
+    LOTE_ACESSOS = 500       # Acessos pendentes que forçam a gravação
+
+    def __init__(self, caminho: str = None, max_bytes: int = MAX_BYTES, offline: bool = False):
+        self.caminho = caminho or CAMINHO_PADRAO
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._acessos = {}  # chave -> acessado_em ainda não gravado
+        self._ultimo_despejo = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False)
+        # WAL: leituras não bloqueiam a escrita e o commit não força fsync a cada página
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                corpo TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                expira_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_acessado ON respostas(acessado_em)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_expira ON respostas(expira_em)")
+        self._conn.commit()
+        self._total = self._conn.execute(
+            "SELECT COALESCE(SUM(tamanho), 0) FROM respostas"
+        ).fetchone()[0]
+
+    @staticmethod
+    def chave(url: str, params: dict) -> str:
+        conteudo = url + "?" + json.dumps(params or {}, sort_keys=True, default=str)
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def ttl(params: dict) -> int:
+        """TTL longo se todas as datas dos parâmetros estão no passado."""
+        datas = [d for d in (_data_param(v) for v in (params or {}).values()) if d]
+        if datas and max(datas) < date.today():
+            return TTL_PASSADO
+        return TTL_HOJE
+
+    def obter(self, url: str, params: dict):
+        """Retorna o JSON em cache (ou None). Offline ignora a expiração."""
+        chave = self.chave(url, params)
+        agora = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT corpo, expira_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if row is None or (row[1] < agora and not self.offline):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._acessos[chave] = agora
+            if len(self._acessos) >= self.LOTE_ACESSOS:
+                self._gravar_acessos()
+                self._conn.commit()
+        return json.loads(row[0])
+
+    def salvar(self, url: str, params: dict, corpo: str):
+        """Grava a resposta (texto JSON) e aplica o limite de tamanho."""
+        chave = self.chave(url, params)
+        agora = time.time()
+        with self._lock:
+            anterior = self._conn.execute(
+                "SELECT tamanho FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?)",
+                (chave, corpo, len(corpo), agora + self.ttl(params), agora),
+            )
+            self._acessos.pop(chave, None)
+            self._total += len(corpo) - (anterior[0] if anterior else 0)
+            self._gravar_acessos()
+            if self._total > self.max_bytes or agora - self._ultimo_despejo >= self.INTERVALO_DESPEJO:
+                self._despejar(agora)
+            self._conn.commit()
+
+    def _gravar_acessos(self):
+        """Grava, numa única instrução, os acessos acumulados pelos hits."""
+        if self._acessos:
+            self._conn.executemany(
+                "UPDATE respostas SET acessado_em = ? WHERE chave = ?",
+                [(quando, chave) for chave, quando in self._acessos.items()],
+            )
+            self._acessos.clear()
+
+    def _despejar(self, agora: float):
+        """Remove expirados e, acima de max_bytes, os menos acessados (LRU)."""
+        self._ultimo_despejo = agora
+        liberado = self._conn.execute(
+            "SELECT COALESCE(SUM(tamanho), 0) FROM respostas WHERE expira_em < ?", (agora,)
+        ).fetchone()[0]
+        if liberado:
+            self._conn.execute("DELETE FROM respostas WHERE expira_em < ?", (agora,))
+            self._total -= liberado
+        if self._total <= self.max_bytes:
+            return
+        for chave, tamanho in self._conn.execute(
+            "SELECT chave, tamanho FROM respostas ORDER BY acessado_em"
+        ).fetchall():
+            self._conn.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            self._total -= tamanho
+            if self._total <= self.max_bytes:
+                break
+
+    def estatisticas(self) -> dict:
+        return {"cache_hits": self.hits, "cache_misses": self.misses, "cache_bytes": self._total}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache() -> Optional[CacheHTTP]:
+    """Cache compartilhado do processo (None se LICITAFLIX_CACHE=0)."""
+    global _cache
+    if os.getenv("LICITAFLIX_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheHTTP(
+                caminho=os.getenv("LICITAFLIX_CACHE_PATH"),
+                offline=os.getenv("LICITAFLIX_OFFLINE", "0") == "1",
+            )
+        return _cache
@@ -0,0 +1,120 @@
+"""
+Licitaflix — Sincronização incremental
+Watermarks por (endpoint, UF, modalidade): cada busca baixa só o delta
+desde a última sincronização bem-sucedida.
+
+Cada janela é uma consulta só, dividida em shards diários apenas quando é
+grande demais; janelas e shards que falham ficam pendentes na watermark e
+são refeitos na execução seguinte.
+"""
+from datetime import date, timedelta
+
+MARGEM_DIAS = 1  # Sobreposição para registros publicados com atraso
+
+# Fontes que são um retrato do momento (não uma janela de publicação):
+# sempre consultadas por inteiro, sem watermark
+FONTES_SEM_WATERMARK = {"pncp_propostas"}
+
+
+def _chave(endpoint: str, uf: str = None, modalidade: int = None) -> tuple:
+    return (endpoint, uf or "", modalidade or 0)
+
+
+class Watermarks:
+    """Última data de publicação vista por (endpoint, UF, modalidade)."""
+
+    def __init__(self, registros: list = None):
+        self._datas = {}
+        self._pendentes = {}  # chave -> {(inicio, fim)} de shards que falharam
+        self._alteradas = set()
+        for r in registros or []:
+            chave = _chave(r["endpoint"], r.get("uf"), r.get("modalidade"))
+            if r.get("ultima_data"):
+                self._datas[chave] = str(r["ultima_data"])[:10]
+            if r.get("shards_pendentes"):
+                self._pendentes[chave] = {tuple(s) for s in r["shards_pendentes"]}
+
+    def inicio(self, endpoint: str, uf: str, modalidade: int,
+               data_inicio: str, ultima_busca: str = None) -> str:
+        """
+        Início efetivo da janela para uma consulta.
+
+        Usa o menor entre a watermark e a última busca do(s) perfil(is), menos
+        a margem de sobreposição — perfis que nunca buscaram recebem a janela
+        completa.
+        """
+        ultima = self._datas.get(_chave(endpoint, uf, modalidade))
+        if not ultima or not ultima_busca:
+            return data_inicio
+        corte = min(ultima, str(ultima_busca)[:10])
+        inicio = (date.fromisoformat(corte) - timedelta(days=MARGEM_DIAS)).isoformat()
+        return max(data_inicio, inicio)
+
+    def avancar(self, endpoint: str, uf: str, modalidade: int, data: str):
+        if not data:
+            return
+        chave = _chave(endpoint, uf, modalidade)
+        if data > self._datas.get(chave, ""):
+            self._datas[chave] = data
+            self._alteradas.add(chave)
+
+    def shards_pendentes(self, endpoint: str, uf: str, modalidade: int) -> list:
+        """Shards (inicio, fim) que falharam em execuções anteriores."""
+        return sorted(self._pendentes.get(_chave(endpoint, uf, modalidade), ()))
+
+    def marcar_shard(self, endpoint: str, uf: str, modalidade: int,
+                     shard: tuple, completo: bool):
+        """
+        Registra o resultado de um shard: falhas ficam pendentes até completar.
+        Um shard completo também quita os pendentes contidos na sua janela.
+        """
+        chave = _chave(endpoint, uf, modalidade)
+        pendentes = self._pendentes.setdefault(chave, set())
+        antes = len(pendentes)
+        if completo:
+            pendentes -= {p for p in pendentes if contido(p, shard)}
+        else:
+            pendentes.add(tuple(shard))
+        if len(pendentes) != antes:
+            self._alteradas.add(chave)
+
+    def pendentes(self) -> list:
+        """Watermarks alteradas nesta execução (para persistir)."""
+        return [
+            {"endpoint": e, "uf": uf, "modalidade": mod,
+             "ultima_data": self._datas.get((e, uf, mod)),
+             "shards_pendentes": [list(s) for s in sorted(self._pendentes.get((e, uf, mod), ()))],
+             "updated_at": "now()"}
+            for e, uf, mod in sorted(self._alteradas)
+        ]
+
+
+def planejar_shards(data_inicio: str, data_fim: str, dias: int = 1) -> list:
+    """
+    Divide [data_inicio, data_fim] em shards de `dias` dias (inclusivos).
+
+    As APIs filtram só por data, então um dia é a menor granularidade.
+    """
+    inicio, fim = date.fromisoformat(data_inicio), date.fromisoformat(data_fim)
+    shards = []
+    while inicio <= fim:
+        ate = min(fim, inicio + timedelta(days=dias - 1))
+        shards.append((inicio.isoformat(), ate.isoformat()))
+        inicio = ate + timedelta(days=1)
+    return shards
+
+
+def contido(shard: tuple, janela: tuple) -> bool:
+    """Se o shard (inicio, fim) está dentro da janela (inicio, fim)."""
+    return janela[0] <= shard[0] and shard[1] <= janela[1]
+
+
+def dias_pulados(data_inicio: str, inicio_efetivo: str) -> int:
+    """Quantos dias da janela pedida deixaram de ser baixados."""
+    return (date.fromisoformat(inicio_efetivo) - date.fromisoformat(data_inicio)).days
+
+
+def maior_data(licitacoes: list) -> str:
+    """Maior data_publicacao (YYYY-MM-DD) de uma lista, ou "" se não houver."""
+    datas = [str(l["data_publicacao"])[:10] for l in licitacoes if l.get("data_publicacao")]
+    return max(datas) if datas else ""
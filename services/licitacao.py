@@ -0,0 +1,79 @@
+"""
+Licitaflix — Licitação
+Registro compacto de uma licitação normalizada para o pipeline em memória.
+
+Cada licitação usa `__slots__` (sem __dict__ por instância), strings repetidas
+(fonte, modalidade, situação, UF) são internadas e o payload bruto da API fica
+como bytes JSON — só é decodificado quando alguém acessa `dados_brutos`.
+A conversão para dict acontece apenas na fronteira com o Supabase.
+"""
+import json
+import sys
+
+CAMPOS = (
+    "id_compra", "numero_controle_pncp", "fonte", "modalidade", "modalidade_codigo",
+    "objeto", "valor_estimado", "valor_homologado", "orgao", "uasg", "uf", "municipio",
+    "situacao", "data_publicacao", "data_abertura_proposta", "data_encerramento_proposta",
+    "data_resultado", "numero_itens", "numero_processo", "srp",
+)
+
+# Campos com poucos valores distintos: uma única cópia de cada string
+_INTERNADOS = (
+    "fonte", "modalidade", "situacao", "uf", "municipio", "orgao", "uasg", "data_publicacao",
+)
+
+
+class Licitacao:
+    """Licitação normalizada; lê-se como um dict (`get`, `[]`, `in`)."""
+
+    __slots__ = CAMPOS + ("_bruto",)
+
+    def __init__(self, dados_brutos=None, **campos):
+        for campo in CAMPOS:
+            valor = campos.get(campo)
+            if campo in _INTERNADOS and isinstance(valor, str):
+                valor = sys.intern(valor)
+            setattr(self, campo, valor)
+        self._bruto = None
+        if dados_brutos is not None:
+            self._bruto = json.dumps(
+                dados_brutos, default=str, ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+
+    @property
+    def dados_brutos(self):
+        """Payload original da API (decodificado a cada acesso)."""
+        return json.loads(self._bruto) if self._bruto else None
+
+    # --- Interface de dict (leitura) ---
+
+    def get(self, chave: str, padrao=None):
+        return self[chave] if chave in self else padrao
+
+    def __getitem__(self, chave: str):
+        if chave == "dados_brutos":
+            return self.dados_brutos
+        if chave not in CAMPOS:
+            raise KeyError(chave)
+        return getattr(self, chave)
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in CAMPOS or chave == "dados_brutos"
+
+    def keys(self):
+        return CAMPOS + ("dados_brutos",)
+
+    def __repr__(self):
+        return f"Licitacao({self.fonte}:{self.id_compra})"
+
+    # --- Fronteira com o Supabase ---
+
+    def para_dict(self) -> dict:
+        """
+        Dict para upsert; `dados_brutos` vai como texto JSON, direto dos
+        bytes guardados (sem decodificar e re-serializar).
+        """
+        dados = {campo: getattr(self, campo) for campo in CAMPOS}
+        if self._bruto:
+            dados["dados_brutos"] = self._bruto.decode("utf-8")
+        return dados
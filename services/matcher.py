@@ -0,0 +1,363 @@
+"""
+Licitaflix — Matcher global
+Uma única passada de matching para vários perfis.
+
+Os termos de todos os perfis viram uma tabela deduplicada (texto → lista de
+(perfil, termo_id)); cada objeto é normalizado, varrido pelo autômato exato
+e pontuado uma vez contra os termos distintos, e os scores são distribuídos
+aos perfis — respeitando os filtros de cada um (regiões, modalidades, valor).
+O custo passa a crescer com os termos distintos, não com perfis × termos.
+Perfis com modo_match = 'vetorial' são casados à parte, por TF-IDF
+(services.vetorial), sobre as licitações aceitas pelos seus filtros.
+
+Corpus grandes podem ser pontuados em paralelo (`casar_paralelo`): os lotes
+vão para um ProcessPoolExecutor cujos workers compilam o conjunto de termos
+uma única vez, e os resultados voltam na ordem dos lotes (mesma saída da
+passada serial).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from services import normalizacao
+from services.corpus import no_escopo
+from services.exato import obter_matcher
+from services.licitacao import CAMPOS, Licitacao
+from services.normalizacao import normalizar_licitacao, normalizar_termo
+from services.prefiltro import IndiceInvertido
+from services.scoring import obter_scorer
+from services.vetorial import VETORIAL_DISPONIVEL, MatcherVetorial
+
+
+def termos_ativos(perfil: dict) -> list:
+    """
+    Termos ativos do perfil, os que mais casaram primeiro (vezes_encontrado,
+    depois score_relevancia): vencem os empates e saem antes da cascata.
+    """
+    ativos = [t for t in perfil.get("termos_busca", []) if t.get("ativo", True)]
+    return sorted(ativos, key=lambda t: (-(t.get("vezes_encontrado") or 0),
+                                         -(t.get("score_relevancia") or 0)))
+
+
+# Situações (normalizadas) de licitações que não aceitam mais propostas
+SITUACOES_ENCERRADAS = (
+    "encerrad", "revogad", "anulad", "cancelad", "desert", "fracassad",
+    "homologad", "adjudicad", "suspens",
+)
+
+
+def _prazo_vencido(lic, agora: str) -> bool:
+    """Encerramento das propostas já passou (datas ISO; ausente não exclui)."""
+    fim = lic.get("data_encerramento_proposta")
+    return bool(fim) and str(fim)[:19] < agora[:len(str(fim)[:19])]
+
+
+def compilar_filtro(perfil: dict):
+    """
+    Chave e predicado compilado dos filtros de um perfil (perfis iguais
+    compartilham). Roda antes de qualquer normalização ou scoring, do
+    critério mais barato ao mais caro: escopo (UF/modalidade), faixa de
+    valor, situação e prazo (excluir_encerradas) e termos de exclusão.
+    """
+    regioes = tuple(sorted(perfil.get("regioes") or []))
+    modalidades = tuple(sorted(perfil.get("modalidades") or []))
+    minimo, maximo = perfil.get("valor_minimo"), perfil.get("valor_maximo")
+    encerradas = bool(perfil.get("excluir_encerradas"))
+    exclusao = tuple(sorted({
+        f" {t} " for t in map(normalizar_termo, perfil.get("termos_exclusao") or []) if t
+    }))
+    agora = datetime.now().isoformat(timespec="seconds")
+
+    def aceita(lic) -> bool:
+        if not no_escopo(lic, regioes, modalidades):
+            return False
+        valor = lic.get("valor_estimado")
+        if valor is not None:  # Valor não informado não exclui
+            if minimo is not None and valor < minimo:
+                return False
+            if maximo is not None and valor > maximo:
+                return False
+        if encerradas:
+            situacao = normalizar_termo(lic.get("situacao") or "")
+            if any(s in situacao for s in SITUACOES_ENCERRADAS) or _prazo_vencido(lic, agora):
+                return False
+        if exclusao:
+            texto = f" {normalizar_licitacao(lic).texto} "
+            if any(t in texto for t in exclusao):
+                return False
+        return True
+
+    return (regioes, modalidades, minimo, maximo, encerradas, exclusao), aceita
+
+
+class MatcherGlobal:
+    """Matching de vários perfis com os termos deduplicados."""
+
+    def __init__(self, perfis: list, scorer, cobertura: float = 0.0,
+                 score_minimo: int = 60, score_exato: int = 100, lote: int = 2000):
+        self.scorer = scorer
+        self.cobertura = cobertura
+        self.score_minimo = score_minimo
+        self.score_exato = score_exato
+        self.lote = lote
+        self._perfis = perfis
+
+        # Perfis em modo vetorial saem da tabela fuzzy (ver services.vetorial)
+        vetoriais = [p for p in perfis if p.get("modo_match") == "vetorial"]
+        if vetoriais and not VETORIAL_DISPONIVEL:
+            print("scipy não instalado — perfis vetoriais usando fuzzy")
+            vetoriais = []
+        fuzzy = [p for p in perfis if p not in vetoriais]
+        self.exato = obter_matcher([{"id": p["id"], "termos_busca": termos_ativos(p)} for p in fuzzy])
+
+        # Tabela de termos distintos e, por perfil, as colunas na ordem dos seus termos
+        self.termos = []          # textos distintos (normalizados)
+        indice_termo = {}
+        self.perfis = []          # (perfil_id, colunas, termos_ativos, chave do filtro)
+        self._filtros = {}        # chave → predicado
+        for perfil in fuzzy:
+            ativos = termos_ativos(perfil)
+            if not ativos:
+                continue
+            colunas = []
+            for t in ativos:
+                texto = normalizar_termo(t["termo"])
+                if texto not in indice_termo:
+                    indice_termo[texto] = len(self.termos)
+                    self.termos.append(texto)
+                colunas.append(indice_termo[texto])
+            chave, aceita = compilar_filtro(perfil)
+            self._filtros.setdefault(chave, aceita)
+            self.perfis.append((perfil["id"], np.array(colunas), ativos, chave))
+        self._chaves_fuzzy = {p[3] for p in self.perfis}
+        # Colunas de cada perfil: a cascata do scorer para quando todos têm 100
+        self._grupos = [np.array(c) for c in {tuple(p[1]) for p in self.perfis}]
+
+        self.perfis_vetoriais = []  # (perfil_id, chave do filtro)
+        entradas = []
+        for perfil in vetoriais:
+            ativos = termos_ativos(perfil)
+            if not ativos:
+                continue
+            chave, aceita = compilar_filtro(perfil)
+            self._filtros.setdefault(chave, aceita)
+            self.perfis_vetoriais.append((perfil["id"], chave))
+            entradas.append((perfil["id"], ativos, self._filtros[chave]))
+        self.vetorial = MatcherVetorial(entradas) if entradas else None
+
+        self._ultimo_corpus = None  # (corpus, resultados) da última passada
+
+    def _vazio(self) -> dict:
+        return {p[0]: {"matches": [], "total_api": 0, "objetos": 0, "exatos": 0, "candidatos": 0,
+                       "truncadas": 0}
+                for p in self.perfis + self.perfis_vetoriais}
+
+    def casar_corpus(self, corpus, processos: int = None, callback=None) -> dict:
+        """
+        `casar` sobre o corpus inteiro, calculado uma vez e reaproveitado.
+
+        Args:
+            processos: > 1 pontua em paralelo (`casar_paralelo`)
+            callback: função(msg, progresso) chamada a cada lote
+        """
+        if self._ultimo_corpus is None or self._ultimo_corpus[0] is not corpus:
+            if processos and processos > 1:
+                resultados = self.casar_paralelo(corpus.licitacoes, processos, callback)
+            else:
+                resultados = self.casar(corpus.licitacoes, callback, total=len(corpus.licitacoes))
+            self._ultimo_corpus = (corpus, resultados)
+        return self._ultimo_corpus[1]
+
+    def casar(self, licitacoes, callback=None, total: int = None) -> dict:
+        """
+        Faz o matching de um iterável de licitações (consumido em lotes).
+
+        Args:
+            callback: função(msg, progresso) chamada a cada lote (progresso
+                só é conhecido com `total`)
+
+        Returns:
+            {perfil_id: {"matches", "total_api", "objetos", "exatos", "candidatos",
+            "truncadas"}} — truncadas: matches vetoriais cortados pelo top-k
+        """
+        resultados = self._vazio()
+        licitacoes = iter(licitacoes)
+        feitas = 0
+        vetoriais = [] if self.vetorial else None  # Acumuladas para o ajuste TF-IDF
+        while True:
+            lote = list(islice(licitacoes, self.lote))
+            if not lote:
+                break
+            self._casar_lote(lote, resultados, vetoriais)
+            feitas += len(lote)
+            if callback and total:
+                callback(f"Pontuadas {feitas}/{total} licitações...", feitas / total)
+        if self.vetorial:
+            self.vetorial.casar(vetoriais, resultados)
+        return resultados
+
+    def casar_paralelo(self, licitacoes: list, processos: int = None, callback=None) -> dict:
+        """
+        `casar` em paralelo: lotes pontuados num ProcessPoolExecutor.
+
+        Cada worker recebe os perfis uma única vez (initializer) e monta o
+        próprio matcher; os lotes levam só os campos usados no matching (sem
+        o payload bruto) e devolvem índices, remontados aqui na ordem dos lotes.
+        """
+        processos = processos or os.cpu_count() or 1
+        lotes = [licitacoes[i:i + self.lote] for i in range(0, len(licitacoes), self.lote)]
+        resultados = self._vazio()
+        if not lotes:
+            return resultados
+        config = (self._perfis, self.scorer.nome, self.cobertura,
+                  self.score_minimo, self.score_exato, self.lote)
+        with ProcessPoolExecutor(max_workers=min(processos, len(lotes)),
+                                 mp_context=multiprocessing.get_context(_CONTEXTO_WORKERS),
+                                 initializer=_iniciar_worker, initargs=config) as executor:
+            futuros = [executor.submit(_casar_lote_worker, [_leve(lic) for lic in lote])
+                       for lote in lotes]
+            # Ordem de submissão = ordem da passada serial (merge determinístico)
+            for n, (lote, futuro) in enumerate(zip(lotes, futuros), 1):
+                for perfil_id, parcial in futuro.result().items():
+                    r = resultados[perfil_id]
+                    for campo in ("total_api", "objetos", "exatos", "candidatos", "truncadas"):
+                        r[campo] += parcial[campo]
+                    r["matches"].extend(
+                        {**m, "licitacao": lote[m["licitacao"]]} for m in parcial["matches"]
+                    )
+                if callback:
+                    callback(f"Pontuados {n}/{len(lotes)} lotes ({processos} processos)...",
+                             n / len(lotes))
+        if self.vetorial:
+            self.vetorial.casar(licitacoes, resultados)
+        return resultados
+
+    def _casar_lote(self, lote: list, resultados: dict, vetoriais: list = None):
+        """
+        Pontua um lote para os perfis fuzzy; as licitações aceitas por algum
+        perfil vetorial são acrescentadas em `vetoriais` (se dada).
+        """
+        # Filtros por grupo de perfis com os mesmos critérios
+        aceitos_filtro = {
+            chave: np.fromiter((aceita(lic) for lic in lote), dtype=bool, count=len(lote))
+            for chave, aceita in self._filtros.items()
+        }
+        for perfil_id, *_, chave in self.perfis + self.perfis_vetoriais:
+            resultados[perfil_id]["total_api"] += int(aceitos_filtro[chave].sum())
+        if vetoriais is not None:
+            relevante = np.zeros(len(lote), dtype=bool)
+            for _, chave in self.perfis_vetoriais:
+                relevante |= aceitos_filtro[chave]
+            vetoriais.extend(lote[i] for i in np.flatnonzero(relevante))
+        if not self.perfis:
+            return
+
+        # Só interessam objetos não vazios aceitos por algum perfil fuzzy
+        aceitos_filtro = {c: a for c, a in aceitos_filtro.items() if c in self._chaves_fuzzy}
+        relevante = np.zeros(len(lote), dtype=bool)
+        for aceitos in aceitos_filtro.values():
+            relevante |= aceitos
+        linhas = [i for i in np.flatnonzero(relevante) if lote[i].get("objeto")]
+        if not linhas:
+            return
+        lics = [lote[i] for i in linhas]
+        aceitos_filtro = {chave: a[linhas] for chave, a in aceitos_filtro.items()}
+
+        # Forma normalizada (cache por id_compra + hash), consumida por todas as etapas
+        normalizados = [normalizar_licitacao(lic) for lic in lics]
+        objetos = [n.texto for n in normalizados]
+
+        # Passada exata (autômato com os termos de todos os perfis)
+        hits = [self.exato.buscar(texto) for texto in objetos]
+
+        # Prefiltro por termo distinto: linhas × termos
+        if self.cobertura > 0:
+            indice = IndiceInvertido([n.tokens for n in normalizados])
+            candidato = np.column_stack([
+                indice.candidatos_termo(t, self.cobertura) for t in self.termos
+            ])
+        else:
+            candidato = np.ones((len(objetos), len(self.termos)), dtype=bool)
+
+        # Linhas que cada perfil ainda precisa pontuar
+        pendentes = {}
+        for perfil_id, colunas, ativos, chave in self.perfis:
+            r = resultados[perfil_id]
+            aceitos = aceitos_filtro[chave]
+            r["objetos"] += int(aceitos.sum())
+            exatos = np.fromiter((perfil_id in h for h in hits), dtype=bool, count=len(lics))
+            for i in np.flatnonzero(aceitos & exatos):
+                termo_id, termo = hits[i][perfil_id]
+                r["exatos"] += 1
+                r["matches"].append({
+                    "licitacao": lics[i], "termo": termo,
+                    "score": self.score_exato / 100.0, "termo_id": termo_id,
+                })
+            linhas_perfil = np.flatnonzero(aceitos & ~exatos & candidato[:, colunas].any(axis=1))
+            r["candidatos"] += len(linhas_perfil)
+            pendentes[perfil_id] = linhas_perfil
+
+        # Uma matriz: linhas candidatas de qualquer perfil × termos distintos
+        todas = np.unique(np.concatenate([*pendentes.values(), np.array([], dtype=np.int64)]))
+        if not len(todas):
+            return
+        matriz = self.scorer.matriz([objetos[i] for i in todas], self.termos,
+                                    minimo=self.score_minimo, grupos=self._grupos)
+        posicao = np.searchsorted(todas, np.arange(len(objetos)))
+
+        # Distribui aos perfis: melhor termo do perfil (primeiro em empate)
+        for perfil_id, colunas, ativos, _ in self.perfis:
+            linhas_perfil = pendentes[perfil_id]
+            if not len(linhas_perfil):
+                continue
+            sub = matriz[posicao[linhas_perfil]][:, colunas]
+            melhores = sub.argmax(axis=1)
+            scores = sub[np.arange(len(linhas_perfil)), melhores]
+            for i, j, score in zip(linhas_perfil, melhores, scores):
+                if score >= self.score_minimo:
+                    resultados[perfil_id]["matches"].append({
+                        "licitacao": lics[i], "termo": ativos[j]["termo"],
+                        "score": int(score) / 100.0, "termo_id": ativos[j].get("id"),
+                    })
+
+
+# --- Workers do modo paralelo ---
+
+# Sem fork: o processo do Streamlit tem várias threads, e um filho criado com
+# fork herdaria travados os locks que elas seguravam (ex.: exato._cache_lock)
+_CONTEXTO_WORKERS = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_matcher_worker = None
+
+
+def _iniciar_worker(perfis, nome_scorer, cobertura, score_minimo, score_exato, lote):
+    """Compila o matcher do worker uma vez (termos, autômato, filtros)."""
+    global _matcher_worker
+    scorer = obter_scorer(nome_scorer)
+    if hasattr(scorer, "workers"):
+        scorer.workers = 1  # O paralelismo já vem dos processos
+    # Cache de normalização só em memória (o processo principal é quem persiste)
+    normalizacao._cache = normalizacao.CacheNormalizacao()
+    _matcher_worker = MatcherGlobal(perfis, scorer, cobertura, score_minimo, score_exato, lote)
+
+
+def _leve(lic) -> Licitacao:
+    """Cópia só com os campos do matching (sem o payload bruto) para o worker."""
+    return Licitacao(**{campo: lic.get(campo) for campo in CAMPOS})
+
+
+def _casar_lote_worker(lote: list) -> dict:
+    """Pontua um lote no worker; os matches referenciam a licitação pelo índice."""
+    resultados = _matcher_worker._vazio()
+    _matcher_worker._casar_lote(lote, resultados)
+    posicao = {id(lic): i for i, lic in enumerate(lote)}
+    for r in resultados.values():
+        for m in r["matches"]:
+            m["licitacao"] = posicao[id(m["licitacao"])]
+    return resultados
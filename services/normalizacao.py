@@ -0,0 +1,164 @@
+"""
+Licitaflix — Normalização de texto
+Forma canônica dos objetos e termos usada pelo matching: minúsculas, sem
+acentos, sem pontuação, espaços colapsados, sem prefixos burocráticos
+("contratação de empresa para ...") e já tokenizada.
+
+A forma normalizada de cada objeto fica num LRU chaveado por id_compra +
+hash do conteúdo, persistido em disco entre execuções.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+_RE_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Tabela de tradução Latin-1/Latin Extended-A → letra base (mais rápida que NFKD por char)
+_SEM_ACENTO = {
+    cp: unicodedata.normalize("NFKD", chr(cp))[0]
+    for cp in range(0xC0, 0x180)
+    if unicodedata.normalize("NFKD", chr(cp))[0] != chr(cp)
+}
+
+# Prefixos sem valor para o matching (já normalizados; os mais longos primeiro)
+PREFIXOS_BOILERPLATE = sorted([
+    "objeto",
+    "o objeto da presente licitacao e",
+    "aquisicao de",
+    "fornecimento de",
+    "prestacao de servicos de",
+    "contratacao de servicos de",
+    "contratacao de empresa para",
+    "contratacao de empresa para prestacao de servicos de",
+    "contratacao de empresa especializada para",
+    "contratacao de empresa especializada em",
+    "contratacao de empresa especializada para prestacao de servicos de",
+    "registro de precos para",
+    "registro de precos para aquisicao de",
+    "registro de precos para eventual aquisicao de",
+    "registro de precos para futura e eventual aquisicao de",
+], key=len, reverse=True)
+
+MAX_ITENS = 100_000
+CAMINHO_PADRAO = os.path.join(os.path.dirname(__file__), "..", ".cache", "normalizacao.json")
+
+TextoNormalizado = namedtuple("TextoNormalizado", ["texto", "tokens"])
+
+
+def dobrar_acentos(texto: str) -> str:
+    """Minúsculas e sem acentos ("Aquisição" → "aquisicao")."""
+    return texto.lower().translate(_SEM_ACENTO)
+
+
+def tokens(texto: str) -> list:
+    """Tokens alfanuméricos do texto já normalizado."""
+    return _RE_TOKEN.findall(texto)
+
+
+def normalizar_termo(texto: str) -> str:
+    """Termo de busca normalizado (sem remover prefixos)."""
+    return " ".join(tokens(dobrar_acentos(texto)))
+
+
+def normalizar(texto: str) -> TextoNormalizado:
+    """Normaliza um objeto: dobra acentos, tokeniza e remove prefixos burocráticos."""
+    toks = tokens(dobrar_acentos(texto or ""))
+    texto_norm = " ".join(toks)
+    removido = True
+    while removido:
+        removido = False
+        for prefixo in PREFIXOS_BOILERPLATE:
+            if texto_norm.startswith(prefixo + " "):
+                texto_norm = texto_norm[len(prefixo) + 1:]
+                removido = True
+                break
+    return TextoNormalizado(texto_norm, tuple(texto_norm.split()))
+
+
+def _hash(texto: str) -> str:
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class CacheNormalizacao:
+    """LRU de objetos normalizados, chaveado por (id_compra, hash do objeto)."""
+
+    def __init__(self, max_itens: int = MAX_ITENS, caminho: str = None):
+        self.max_itens = max_itens
+        self.caminho = caminho
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()
+        self._alterado = False
+        self._lock = threading.Lock()
+        if caminho:
+            self.carregar()
+
+    def obter(self, id_compra: str, texto: str) -> TextoNormalizado:
+        chave = (id_compra or "", _hash(texto or ""))
+        with self._lock:
+            norm = self._itens.get(chave)
+            if norm is not None:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return norm
+        norm = normalizar(texto)
+        with self._lock:
+            self.misses += 1
+            self._itens[chave] = norm
+            self._alterado = True
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return norm
+
+    def carregar(self):
+        """Lê o cache do disco (arquivo ausente ou inválido = cache vazio)."""
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                registros = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for id_compra, h, texto in registros[-self.max_itens:]:
+                self._itens[(id_compra, h)] = TextoNormalizado(texto, tuple(texto.split()))
+
+    def salvar(self):
+        """Grava o cache em disco (só se mudou), do menos ao mais recente."""
+        if not self.caminho or not self._alterado:
+            return
+        with self._lock:
+            registros = [[i, h, norm.texto] for (i, h), norm in self._itens.items()]
+            self._alterado = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(registros, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(temporario, self.caminho)
+        except OSError as e:
+            print(f"Erro salvando cache de normalização: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache_normalizacao() -> CacheNormalizacao:
+    """Cache compartilhado do processo (só em memória se LICITAFLIX_CACHE=0)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            persistir = os.getenv("LICITAFLIX_CACHE", "1") != "0"
+            _cache = CacheNormalizacao(
+                caminho=(os.getenv("LICITAFLIX_NORM_CACHE_PATH") or CAMINHO_PADRAO)
+                if persistir else None
+            )
+        return _cache
+
+
+def normalizar_licitacao(lic) -> TextoNormalizado:
+    """Objeto normalizado de uma licitação, via cache."""
+    return obter_cache_normalizacao().obter(lic.get("id_compra"), lic.get("objeto") or "")
@@ -0,0 +1,76 @@
+"""
+Licitaflix — Prefiltro de candidatos
+Índice invertido (tokens + trigramas de caracteres) sobre os objetos de um
+lote: só os objetos que compartilham uma fração mínima das features de algum
+termo seguem para o scoring fuzzy.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from services.normalizacao import dobrar_acentos, tokens
+
+
+@lru_cache(maxsize=200_000)
+def _features_token(tok: str) -> tuple:
+    """Token ("#tok") e seus trigramas com borda (" to", "tok", "ok ")."""
+    padded = f" {tok} "
+    return ("#" + tok,) + tuple(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def features(texto: str) -> set:
+    """Features (tokens e trigramas) de um texto."""
+    return {f for tok in tokens(dobrar_acentos(texto)) for f in _features_token(tok)}
+
+
+class IndiceInvertido:
+    """feature → ids dos objetos que a contêm."""
+
+    def __init__(self, objetos: list):
+        """
+        Args:
+            objetos: tokens de cada objeto, já normalizados
+                (`TextoNormalizado.tokens`)
+        """
+        self.total = len(objetos)
+        self._ids = {}  # feature -> id numérico
+        ids_token = {}  # token -> ids das suas features (tokens se repetem muito)
+        docs, feats = [], []
+        for i, toks in enumerate(objetos):
+            ids = set()
+            for tok in set(toks):
+                ids_tok = ids_token.get(tok)
+                if ids_tok is None:
+                    ids_tok = ids_token[tok] = [
+                        self._ids.setdefault(f, len(self._ids)) for f in _features_token(tok)
+                    ]
+                ids.update(ids_tok)
+            docs.extend([i] * len(ids))
+            feats.extend(ids)
+
+        # Postings contíguos: objetos ordenados por feature
+        feats = np.array(feats, dtype=np.int32)
+        ordem = np.argsort(feats, kind="stable")
+        self._docs = np.array(docs, dtype=np.int32)[ordem]
+        self._inicio = np.searchsorted(feats[ordem], np.arange(len(self._ids) + 1))
+
+    def _postings(self, feature: str):
+        fid = self._ids.get(feature)
+        if fid is None:
+            return None
+        return self._docs[self._inicio[fid]:self._inicio[fid + 1]]
+
+    def candidatos_termo(self, termo: str, cobertura: float) -> np.ndarray:
+        """
+        Máscara dos objetos que contêm ao menos `cobertura` (0–1) das
+        features do termo.
+        """
+        feats = features(termo)
+        if cobertura <= 0 or not feats:
+            return np.ones(self.total, dtype=bool)
+        listas = [p for p in map(self._postings, feats) if p is not None]
+        if not listas:
+            return np.zeros(self.total, dtype=bool)
+        contagem = np.bincount(np.concatenate(listas), minlength=self.total)
+        return contagem >= max(1, math.ceil(cobertura * len(feats)))
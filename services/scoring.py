@@ -0,0 +1,148 @@
+"""
+Licitaflix — Scoring
+Backends de pontuação objetos × termos para o matching.
+
+Score de um par = max(partial_ratio, token_set_ratio), como no fuzzywuzzy.
+O backend "rapidfuzz" calcula cada etapa num único `process.cdist` (C++,
+todos os núcleos) e faz o argmax vetorizado por linha; o backend
+"fuzzywuzzy" usa o laço par a par original e serve de referência de paridade.
+
+A matriz é calculada em cascata, do mais barato ao mais caro: substring
+(termo contido no objeto = 100, como o partial_ratio daria), token_set_ratio
+e, por último, partial_ratio. Uma linha sai da cascata assim que todos os
+grupos de termos (um por perfil) têm um 100 — nenhum termo seguinte passaria
+disso —, e o partial_ratio corta em `minimo` (abaixo dele o valor exato não
+muda nenhuma decisão). Em empate vence o primeiro termo a chegar a 100 na
+etapa mais barata; dentro de uma etapa, o primeiro na ordem dos termos.
+"""
+import os
+
+try:
+    import numpy as np
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process, utils as rf_utils
+    RAPIDFUZZ_DISPONIVEL = True
+except ImportError:  # Sem rapidfuzz: cai no fuzzywuzzy
+    RAPIDFUZZ_DISPONIVEL = False
+
+SCORE_EXATO = 100
+
+
+class _ScorerCascata:
+    """Cascata comum aos backends; cada um implementa as duas etapas fuzzy."""
+
+    def _conjunto(self, objetos: list, termos: list):
+        raise NotImplementedError
+
+    def _parcial(self, objetos: list, termos: list, minimo: int):
+        raise NotImplementedError
+
+    def matriz(self, objetos: list, termos: list, minimo: int = 0, grupos: list = None):
+        """
+        Matriz (objetos × termos) de scores inteiros 0–100, em cascata.
+
+        Args:
+            objetos: textos dos objetos (normalizados)
+            termos: textos dos termos (normalizados)
+            minimo: scores de partial_ratio abaixo disto viram 0 (corte antecipado)
+            grupos: colunas de cada perfil; uma linha só segue na cascata
+                enquanto algum grupo não tem 100 (padrão: todas as colunas)
+        """
+        import numpy as np
+
+        grupos = grupos or [slice(None)]
+
+        def pendentes(m):
+            resolvidas = np.ones(m.shape[0], dtype=bool)
+            for colunas in grupos:
+                resolvidas &= m[:, colunas].max(axis=1, initial=0) >= SCORE_EXATO
+            return np.flatnonzero(~resolvidas)
+
+        # 1. Substring
+        m = np.array([[SCORE_EXATO if t in o else 0 for t in termos] for o in objetos],
+                     dtype=np.float32).reshape(len(objetos), len(termos))
+        # 2. token_set_ratio
+        linhas = pendentes(m)
+        if len(linhas) and termos:
+            m[linhas] = np.maximum(m[linhas], self._conjunto([objetos[i] for i in linhas], termos))
+        # 3. partial_ratio
+        linhas = pendentes(m)
+        if len(linhas) and termos:
+            m[linhas] = np.maximum(m[linhas], self._parcial([objetos[i] for i in linhas], termos, minimo))
+        return np.rint(m).astype(np.int16)
+
+    def melhores(self, objetos: list, termos: list) -> tuple:
+        """
+        Melhor termo de cada objeto.
+
+        Returns:
+            (scores, indices) — score 0–100 e índice do melhor termo por objeto
+        """
+        import numpy as np
+
+        if not objetos or not termos:
+            return [0] * len(objetos), [0] * len(objetos)
+        m = self.matriz(objetos, termos)
+        indices = m.argmax(axis=1)  # argmax devolve o primeiro máximo
+        scores = m[np.arange(len(objetos)), indices]
+        return scores.tolist(), indices.tolist()
+
+
+class ScorerFuzzywuzzy(_ScorerCascata):
+    """Laço Python par a par (comportamento original)."""
+
+    nome = "fuzzywuzzy"
+
+    def _conjunto(self, objetos: list, termos: list):
+        from fuzzywuzzy import fuzz
+
+        return [[fuzz.token_set_ratio(t, o) for t in termos] for o in objetos]
+
+    def _parcial(self, objetos: list, termos: list, minimo: int):
+        from fuzzywuzzy import fuzz
+
+        return [[s if s >= minimo else 0 for s in (fuzz.partial_ratio(t, o) for t in termos)]
+                for o in objetos]
+
+
+def _processar_fuzzywuzzy(texto: str) -> str:
+    """Equivale ao full_process(force_ascii=True) do fuzzywuzzy."""
+    return rf_utils.default_process(texto.encode("ascii", "ignore").decode("ascii"))
+
+
+class ScorerRapidfuzz(_ScorerCascata):
+    """Etapas em lote com rapidfuzz.process.cdist."""
+
+    nome = "rapidfuzz"
+
+    def __init__(self, workers: int = -1):
+        self.workers = workers
+
+    def _conjunto(self, objetos: list, termos: list):
+        # token_set_ratio do fuzzywuzzy pré-processa (ASCII, minúsculas, sem pontuação)
+        return rf_process.cdist(
+            [_processar_fuzzywuzzy(o) for o in objetos],
+            [_processar_fuzzywuzzy(t) for t in termos],
+            scorer=rf_fuzz.token_set_ratio, workers=self.workers,
+        )
+
+    def _parcial(self, objetos: list, termos: list, minimo: int):
+        return rf_process.cdist(
+            objetos, termos, scorer=rf_fuzz.partial_ratio,
+            score_cutoff=minimo or None, workers=self.workers,
+        )
+
+
+BACKENDS = {"fuzzywuzzy": ScorerFuzzywuzzy, "rapidfuzz": ScorerRapidfuzz}
+
+
+def obter_scorer(nome: str = None):
+    """
+    Instancia um backend (nome, LICITAFLIX_SCORER ou o melhor disponível).
+    """
+    nome = nome or os.getenv("LICITAFLIX_SCORER")
+    if not nome:
+        nome = "rapidfuzz" if RAPIDFUZZ_DISPONIVEL else "fuzzywuzzy"
+    if nome == "rapidfuzz" and not RAPIDFUZZ_DISPONIVEL:
+        print("rapidfuzz não instalado — usando fuzzywuzzy")
+        nome = "fuzzywuzzy"
+    return BACKENDS[nome]()
@@ -2,9 +2,19 @@
 Licitaflix — Search Engine
 Motor de busca com fuzzy matching nos objetos das licitações.
 """
+import os
 from datetime import date, timedelta
-from fuzzywuzzy import fuzz
-from services.api_client import ComprasGovClient, MODALIDADES
+from services.api_client import (
+    ComprasGovClient, PNCPClient, MODALIDADES, HORIZONTE_PROPOSTAS_DIAS, iterar_fontes
+)
+from services.corpus import Corpus, FONTES_FILTRAVEIS, MODALIDADES_PADRAO, escopo_perfis
+from services.matcher import MatcherGlobal, compilar_filtro
+from services.normalizacao import obter_cache_normalizacao
+from services.scoring import obter_scorer
+from services.transporte import EstatisticasTransporte
+from services.incremental import (
+    FONTES_SEM_WATERMARK, Watermarks, contido, dias_pulados, maior_data
+)
 from services import supabase_client as db
 
 
@@ -14,10 +24,34 @@ class SearchEngine:
     SCORE_EXATO = 100
     SCORE_MINIMO = 60  # Threshold para considerar um match
 
-    def __init__(self):
+    # Fontes consultadas por padrão ("pncp_publicacao" também disponível)
+    FONTES = ["pncp_propostas", "comprasgov_14133", "comprasgov_pregao", "comprasgov_legado"]
+    # Consulta cuja página 1 indica mais páginas que isso é refeita em shards
+    # diários (menos trabalho perdido numa falha; nunca chega a LIMITE_PAGINAS)
+    PAGINAS_POR_CONSULTA = 100
+    LOTE_SCORING = 2000  # Licitações pontuadas por chamada ao scorer
+    # Recall do prefiltro: fração mínima das features (tokens/trigramas) de um
+    # termo que o objeto precisa conter para ir ao scoring. 0 = sem prefiltro
+    # (padrão: qualquer corte perde alguns matches de partial_ratio baixo);
+    # ative com cobertura_prefiltro=... ou LICITAFLIX_PREFILTRO (ex.: 0.1)
+    PREFILTRO_COBERTURA = float(os.getenv("LICITAFLIX_PREFILTRO", "0"))
+    # Corpus a partir deste tamanho são pontuados em paralelo (processos)
+    LIMIAR_PARALELO = 20_000
+    PROCESSOS_MATCHING = None  # None = os.cpu_count()
+
+    def __init__(self, fontes: list = None, scorer=None, cobertura_prefiltro: float = None):
         self.api = ComprasGovClient()
+        self.scorer = scorer or obter_scorer()
+        self.cobertura_prefiltro = (
+            self.PREFILTRO_COBERTURA if cobertura_prefiltro is None else cobertura_prefiltro
+        )
+        self.pncp = PNCPClient(cache=self.api.cache, transporte=self.api.transporte)
+        self.fontes = fontes or self.FONTES
+        self.estatisticas = {}  # Estatísticas da última consulta às APIs
 
-    def buscar_por_perfil(self, perfil: dict, dias_atras: int = 7, callback=None) -> dict:
+    def buscar_por_perfil(self, perfil: dict, dias_atras: int = 7, callback=None,
+                          corpus: Corpus = None, incremental: bool = True,
+                          matcher: MatcherGlobal = None) -> dict:
         """
         Executa busca completa para um perfil.
         
@@ -25,6 +59,11 @@ class SearchEngine:
             perfil: dict com dados do perfil (incluindo termos_busca)
             dias_atras: quantos dias atrás buscar
             callback: função(msg, progresso) para reportar progresso
+            corpus: licitações já baixadas na execução (evita nova consulta às APIs)
+            incremental: baixar só o delta desde a última sincronização
+                (False = janela completa, para backfill)
+            matcher: matcher global dos perfis da execução (ver `criar_matcher`);
+                com corpus, o matching de todos os perfis roda uma única vez
             
         Returns:
             dict com estatísticas da busca
@@ -38,49 +77,28 @@ class SearchEngine:
         data_fim = date.today().isoformat()
         data_inicio = (date.today() - timedelta(days=dias_atras)).isoformat()
 
-        # Buscar licitações das APIs
-        if callback:
-            callback(f"Consultando APIs para '{perfil['nome']}'...", 0.1)
-
-        licitacoes_raw = self._buscar_apis(
-            data_inicio, data_fim,
-            perfil.get("regioes", []),
-            perfil.get("modalidades", [])
-        )
-
-        if callback:
-            callback(f"Encontradas {len(licitacoes_raw)} licitações. Filtrando...", 0.5)
+        matcher = matcher or self.criar_matcher([perfil])
+        if corpus is not None:
+            # Passada global sobre o corpus compartilhado (feita uma vez por execução)
+            if callback:
+                callback(f"Filtrando {len(corpus)} licitações...", 0.5)
+            casamento = self._casar_corpus(
+                matcher, corpus,
+                (lambda msg, p: callback(msg, 0.5 + 0.2 * p)) if callback else None,
+            )[perfil["id"]]
+        else:
+            # Streaming: cada lote é pontuado assim que suas páginas chegam,
+            # sem acumular o payload bruto das que não casam
+            if callback:
+                callback(f"Consultando APIs para '{perfil['nome']}'...", 0.1)
 
-        # Fazer matching com os termos
-        matches = []
-        for lic in licitacoes_raw:
-            objeto = (lic.get("objeto") or "").lower()
-            if not objeto:
-                continue
+            casamento = matcher.casar(self._iter_apis(
+                data_inicio, data_fim, escopo_perfis([perfil]),
+                ultima_busca=perfil.get("ultima_busca") if incremental else None
+            ))[perfil["id"]]
 
-            melhor_score = 0
-            melhor_termo = ""
-
-            for t in termos_ativos:
-                termo = t["termo"].lower()
-                # Score combinado: partial ratio + token set ratio
-                score_partial = fuzz.partial_ratio(termo, objeto)
-                score_token = fuzz.token_set_ratio(termo, objeto)
-                score = max(score_partial, score_token)
-
-                if score > melhor_score:
-                    melhor_score = score
-                    melhor_termo = t["termo"]
-
-            if melhor_score >= self.SCORE_MINIMO:
-                matches.append({
-                    "licitacao": lic,
-                    "termo": melhor_termo,
-                    "score": melhor_score / 100.0,
-                    "termo_id": next(
-                        (t["id"] for t in termos_ativos if t["termo"] == melhor_termo), None
-                    )
-                })
+        matches = casamento["matches"]
+        estatisticas = corpus.estatisticas if corpus is not None else self.estatisticas
 
         if callback:
             callback(f"{len(matches)} licitações relevantes encontradas!", 0.7)
@@ -94,20 +112,20 @@ class SearchEngine:
             "total_encontradas": perfil.get("total_encontradas", 0) + len(matches)
         })
 
-        # Atualizar contadores dos termos
+        # Atualizar contadores dos termos (matches já trazem o termo_id)
         termos_encontrados = {}
         for m in matches:
-            termos_encontrados[m["termo"]] = termos_encontrados.get(m["termo"], 0) + 1
+            termos_encontrados[m["termo_id"]] = termos_encontrados.get(m["termo_id"], 0) + 1
 
         for t in termos_ativos:
-            if t["termo"] in termos_encontrados:
+            if t.get("id") in termos_encontrados:
                 db.atualizar_termo(t["id"], {
-                    "vezes_encontrado": t.get("vezes_encontrado", 0) + termos_encontrados[t["termo"]]
+                    "vezes_encontrado": (t.get("vezes_encontrado") or 0) + termos_encontrados[t["id"]]
                 })
 
         # Registrar busca no histórico
         for t in termos_ativos:
-            count = termos_encontrados.get(t["termo"], 0)
+            count = termos_encontrados.get(t.get("id"), 0)
             db.registrar_busca(perfil["id"], t["termo"], count)
 
         if callback:
@@ -117,124 +135,375 @@ class SearchEngine:
             "encontradas": len(matches),
             "novas": novas,
             "termos_usados": len(termos_ativos),
-            "total_api": len(licitacoes_raw),
+            "total_api": casamento["total_api"],
+            "exatos": casamento["exatos"],
+            "candidatos": casamento["candidatos"],
+            "truncadas": casamento["truncadas"],
+            "taxa_candidatos": (
+                round(casamento["candidatos"] / casamento["objetos"], 4) if casamento["objetos"] else 0.0
+            ),
+            **estatisticas,
         }
 
-    def buscar_por_categoria(self, categoria_id: str, dias_atras: int = 7, callback=None) -> dict:
+    def criar_matcher(self, perfis: list) -> MatcherGlobal:
+        """
+        Matcher de uma passada para vários perfis: termos deduplicados,
+        cada objeto pontuado uma vez e o resultado distribuído aos perfis.
+        """
+        return MatcherGlobal(
+            perfis, self.scorer, cobertura=self.cobertura_prefiltro,
+            score_minimo=self.SCORE_MINIMO, score_exato=self.SCORE_EXATO,
+            lote=self.LOTE_SCORING,
+        )
+
+    def _casar_corpus(self, matcher: MatcherGlobal, corpus: Corpus, callback=None) -> dict:
+        """Passada global sobre o corpus; em paralelo acima de LIMIAR_PARALELO."""
+        processos = None
+        if len(corpus) >= self.LIMIAR_PARALELO:
+            processos = self.PROCESSOS_MATCHING or os.cpu_count()
+        return matcher.casar_corpus(corpus, processos=processos, callback=callback)
+
+    def montar_corpus(self, perfis: list, dias_atras: int = 7, callback=None,
+                      incremental: bool = True) -> Corpus:
+        """
+        Baixa uma única vez as licitações necessárias para vários perfis.
+
+        Consulta os pares (UF, modalidade) dos perfis (ver `escopo_perfis`);
+        cada perfil depois faz o matching apenas na sua fatia do corpus.
+        """
+        escopo = escopo_perfis(perfis)
+        data_fim = date.today().isoformat()
+        data_inicio = (date.today() - timedelta(days=dias_atras)).isoformat()
+
+        # O delta só vale se todos os perfis já buscaram antes
+        ultimas = [p.get("ultima_busca") for p in perfis]
+        ultima_busca = min(ultimas) if incremental and all(ultimas) else None
+
+        if callback:
+            callback(f"Consultando APIs ({len(perfis)} perfis)...", 0.0)
+
+        # Só entra no corpus o que algum perfil aceita (valor, situação, exclusões...)
+        filtros = [compilar_filtro(p)[1] for p in perfis]
+        baixadas = 0
+        licitacoes = []
+        for lic in self._iter_apis(data_inicio, data_fim, escopo, ultima_busca):
+            baixadas += 1
+            if any(aceita(lic) for aceita in filtros):
+                licitacoes.append(lic)
+        corpus = Corpus(licitacoes)
+        corpus.estatisticas = {**self.estatisticas, "descartadas_filtro": baixadas - len(licitacoes)}
+        return corpus
+
+    # Colunas de `licitacoes` usadas no matching e nos filtros do perfil
+    COLUNAS_BACKFILL = (
+        "id, id_compra, numero_controle_pncp, fonte, modalidade_codigo, objeto, orgao, "
+        "valor_estimado, uf, situacao, data_encerramento_proposta"
+    )
+
+    def backfill_termos(self, perfil: dict, termos: list, corpus: Corpus = None,
+                        callback=None) -> dict:
+        """
+        Casa só os termos novos de um perfil contra as licitações que já
+        temos — as salvas em `licitacoes` e, se dado, o corpus local da última
+        busca —, sem consultar as APIs.
+
+        Os vínculos com licitações salvas entram em lote (os já existentes
+        do perfil ficam como estão); matches do corpus que ainda não estão no
+        banco são salvos como numa busca normal.
+
+        Args:
+            perfil: dict do perfil (filtros de valor, região, exclusão...)
+            termos: linhas de termos_busca recém-criadas (id, termo)
+
+        Returns:
+            dict com analisadas, encontradas (por termo), vinculos e novas
+        """
+        termos = [t for t in termos if t.get("ativo", True)]
+        if not termos:
+            return {"analisadas": 0, "encontradas": 0, "por_termo": {}, "vinculos": 0, "novas": 0}
+        matcher = self.criar_matcher([{**perfil, "termos_busca": termos}])
+
+        if callback:
+            callback("Casando termos com as licitações salvas...", 0.1)
+        # Linhas salvas vão direto, em streaming, para o matcher (só os matches ficam)
+        ids_salvos = set()
+
+        def salvas():
+            for row in db.iterar_licitacoes(self.COLUNAS_BACKFILL):
+                ids_salvos.add(row["id_compra"])
+                yield row
+
+        matches = matcher.casar(salvas())[perfil["id"]]["matches"]
+        vinculos = db.vincular_licitacoes_perfil_batch([
+            {"licitacao_id": m["licitacao"]["id"], "perfil_id": perfil["id"],
+             "termo_encontrado": m["termo"], "score_match": m["score"]}
+            for m in matches
+        ], ignorar_existentes=True)
+
+        # Corpus local: só o que ainda não está no banco
+        novas = 0
+        analisadas = len(ids_salvos)
+        if corpus is not None:
+            if callback:
+                callback("Casando termos com o corpus da última busca...", 0.6)
+            locais = [lic for lic in corpus.licitacoes if lic.get("id_compra") not in ids_salvos]
+            analisadas += len(locais)
+            matches_locais = matcher.casar(locais)[perfil["id"]]["matches"]
+            novas = self._salvar_resultados(matches_locais, perfil["id"])
+            matches = matches + matches_locais
+
+        # Quantas vezes cada termo teria casado
+        por_termo = {}
+        for m in matches:
+            por_termo[m["termo_id"]] = por_termo.get(m["termo_id"], 0) + 1
+        for t in termos:
+            if por_termo.get(t["id"]):
+                db.atualizar_termo(t["id"], {
+                    "vezes_encontrado": (t.get("vezes_encontrado") or 0) + por_termo[t["id"]]
+                })
+
+        if callback:
+            callback(f"✅ {len(matches)} licitações casariam com os termos novos.", 1.0)
+        return {
+            "analisadas": analisadas,
+            "encontradas": len(matches),
+            "por_termo": {t["termo"]: por_termo.get(t["id"], 0) for t in termos},
+            "vinculos": vinculos,
+            "novas": novas,
+        }
+
+    def buscar_por_categoria(self, categoria_id: str, dias_atras: int = 7, callback=None,
+                             incremental: bool = True) -> dict:
         """Busca em todos os perfis de uma categoria."""
         perfis = db.listar_perfis(categoria_id=categoria_id)
         # Carregar termos para cada perfil
-        resultados = {"total_encontradas": 0, "total_novas": 0, "perfis": []}
-
-        for i, perfil in enumerate(perfis):
+        for perfil in perfis:
             perfil["termos_busca"] = db.listar_termos(perfil["id"])
-            if callback:
-                callback(
-                    f"Buscando perfil {i+1}/{len(perfis)}: {perfil['nome']}",
-                    i / len(perfis)
-                )
-            r = self.buscar_por_perfil(perfil, dias_atras)
-            resultados["total_encontradas"] += r["encontradas"]
-            resultados["total_novas"] += r["novas"]
-            resultados["perfis"].append({"nome": perfil["nome"], **r})
-
-        return resultados
+        return self._buscar_perfis(
+            perfis, dias_atras, callback, incremental,
+            lambda i, n, perfil: f"Buscando perfil {i+1}/{n}: {perfil['nome']}"
+        )
 
-    def buscar_todos_hoje(self, dias_atras: int = 7, callback=None) -> dict:
+    def buscar_todos_hoje(self, dias_atras: int = 7, callback=None,
+                          incremental: bool = True) -> dict:
         """Busca em todos os perfis marcados para buscar hoje."""
         perfis = db.listar_perfis_hoje()
+        return self._buscar_perfis(
+            perfis, dias_atras, callback, incremental,
+            lambda i, n, perfil: f"🔍 [{i+1}/{n}] {perfil['nome']}..."
+        )
+
+    def _buscar_perfis(self, perfis: list, dias_atras: int, callback,
+                       incremental: bool, mensagem) -> dict:
+        """Monta o corpus uma vez e faz o matching de cada perfil sobre ele."""
         resultados = {"total_encontradas": 0, "total_novas": 0, "perfis": []}
+        if not perfis:
+            return resultados
+
+        corpus = self.montar_corpus(perfis, dias_atras, callback, incremental)
+        resultados["total_api"] = len(corpus)
+        resultados.update(corpus.estatisticas)
+        # Uma passada de matching para todos os perfis (reaproveitada no laço)
+        matcher = self.criar_matcher(perfis)
+        self._casar_corpus(matcher, corpus, callback)
 
         for i, perfil in enumerate(perfis):
             if callback:
-                callback(
-                    f"🔍 [{i+1}/{len(perfis)}] {perfil['nome']}...",
-                    i / len(perfis)
-                )
-            r = self.buscar_por_perfil(perfil, dias_atras)
+                callback(mensagem(i, len(perfis), perfil), i / len(perfis))
+            r = self.buscar_por_perfil(perfil, dias_atras, corpus=corpus, matcher=matcher)
             resultados["total_encontradas"] += r["encontradas"]
             resultados["total_novas"] += r["novas"]
             resultados["perfis"].append({"nome": perfil["nome"], **r})
 
         return resultados
 
-    def _buscar_apis(self, data_inicio: str, data_fim: str,
-                     regioes: list = None, modalidades: list = None) -> list:
-        """Busca licitações em todas as fontes da API."""
-        todos = []
+    def _iter_apis(self, data_inicio: str, data_fim: str, escopo: list = None,
+                   ultima_busca: str = None):
+        """
+        Gera as licitações de todas as fontes conforme as páginas chegam,
+        deduplicando no caminho por id_compra e nº de controle PNCP (a mesma
+        contratação aparece no ComprasGov 14.133 e no PNCP).
+
+        `escopo` são os pares (UF, modalidade) das fontes filtráveis (ver
+        `escopo_perfis`; None = nacional nas modalidades padrão).
+        A janela de cada (endpoint, UF, modalidade) é uma consulta só,
+        paginada até esgotar; passando de PAGINAS_POR_CONSULTA páginas ela é
+        dividida em shards diários. Janelas e shards que falham (ou são
+        truncados) ficam pendentes na watermark e são refeitos na próxima
+        execução. Com `ultima_busca`, a janela começa na watermark menos a
+        margem de sobreposição, baixando só o delta.
+        Ao terminar, grava as watermarks e preenche `self.estatisticas`; se a
+        consulta é interrompida, as consultas não terminadas ficam pendentes e
+        o erro vai em `self.estatisticas["erro_api"]`.
+        """
+        watermarks = self._carregar_watermarks()
+        consultas, pulados = self._montar_consultas(
+            data_inicio, data_fim, escopo, watermarks, ultima_busca
+        )
 
-        # 1. Contratações Lei 14.133 (principal)
+        cache = self.api.cache
+        cache_antes = cache.estatisticas() if cache else {}
+        transporte = EstatisticasTransporte()  # Só as requisições desta execução
+
+        vistos = set()
+        maiores = [""] * len(consultas)  # Maior data vista por consulta
+        divididas = {}  # Consulta dividida -> nº de shards diários
+        terminadas = set()
+        erro = None
         try:
-            mods = modalidades if modalidades else [1, 2, 6, 7]
-            if regioes:
-                for uf in regioes:
-                    resultados = self.api.buscar_todas_modalidades_14133(
-                        data_inicio, data_fim, uf=uf, modalidades=mods, max_pages=2
-                    )
-                    todos.extend(resultados)
-            else:
-                resultados = self.api.buscar_todas_modalidades_14133(
-                    data_inicio, data_fim, modalidades=mods, max_pages=2
-                )
-                todos.extend(resultados)
+            for evento in iterar_fontes(
+                [self.api, self.pncp], consultas, max_pages=None, stats=transporte,
+                dividir_acima=self.PAGINAS_POR_CONSULTA,
+            ):
+                if evento[0] in ("shard", "fim"):
+                    self._registrar_fim(watermarks, consultas, maiores, divididas, *evento)
+                    if evento[0] == "fim":
+                        terminadas.add(evento[1])
+                    continue
+
+                _, i, licitacoes = evento
+                maiores[i] = max(maiores[i], maior_data(licitacoes))
+                # Deduplicar por id_compra / nº de controle PNCP
+                for lic in licitacoes:
+                    chaves = {lic.get("id_compra"), lic.get("numero_controle_pncp")} - {None, ""}
+                    if chaves & vistos:
+                        continue
+                    vistos.update(chaves)
+                    yield lic
         except Exception as e:
-            print(f"Erro busca 14133: {e}")
+            print(f"Erro busca APIs: {e}")
+            erro = str(e)
+            # Interrompida: o que não terminou fica pendente para a próxima execução
+            for i, c in enumerate(consultas):
+                if i not in terminadas and c["fonte"] not in FONTES_SEM_WATERMARK:
+                    watermarks.marcar_shard(
+                        c["fonte"], c.get("uf"), c.get("modalidade"),
+                        (c["data_inicio"], c["data_fim"]), False,
+                    )
 
-        # 2. Pregões legado
+        self._salvar_watermarks(watermarks)
+        obter_cache_normalizacao().salvar()
+
+        chaves = {
+            (c["fonte"], c.get("uf"), c.get("modalidade"))
+            for c in consultas if c["fonte"] not in FONTES_SEM_WATERMARK
+        }
+        self.estatisticas = {
+            "dias_pulados": pulados,
+            "shards": len(consultas) - len(divididas) + sum(divididas.values()),
+            "shards_pendentes": sum(len(watermarks.shards_pendentes(*k)) for k in chaves),
+        }
+        if erro:
+            self.estatisticas["erro_api"] = erro
+        if cache:
+            cache_depois = cache.estatisticas()
+            for chave in ("cache_hits", "cache_misses"):
+                self.estatisticas[chave] = cache_depois[chave] - cache_antes[chave]
+        # Retries, throttles e páginas perdidas desta execução
+        self.estatisticas.update(transporte.como_dict())
+
+    @staticmethod
+    def _registrar_fim(watermarks: Watermarks, consultas: list, maiores: list,
+                       divididas: dict, tipo: str, i: int, resultado):
+        """
+        Marca nas watermarks um evento "shard" ((janela, completo)) ou "fim"
+        (completo) da consulta i.
+
+        Uma consulta dividida tem cada shard diário marcado por si; o "fim"
+        dela só quita a janela inteira se tudo veio completo. A watermark
+        avança quando nada ficou sem registro: consulta completa ou dividida
+        (os dias que falharam ficam pendentes).
+        """
+        c = consultas[i]
+        if c["fonte"] in FONTES_SEM_WATERMARK:
+            return
+        chave = (c["fonte"], c.get("uf"), c.get("modalidade"))
+        if tipo == "shard":
+            janela, completo = resultado
+            divididas[i] = divididas.get(i, 0) + 1
+            watermarks.marcar_shard(*chave, tuple(janela), completo)
+            return
+        completo = resultado
+        if completo or i not in divididas:
+            watermarks.marcar_shard(*chave, (c["data_inicio"], c["data_fim"]), completo)
+        if completo or i in divididas:
+            watermarks.avancar(*chave, maiores[i])
+
+    def _montar_consultas(self, data_inicio: str, data_fim: str, escopo: list,
+                          watermarks: Watermarks, ultima_busca: str = None) -> tuple:
+        """
+        Planeja as consultas: por fonte — e por par (UF, modalidade) do escopo
+        nas fontes filtráveis (UF None = nacional) — uma consulta com a janela
+        ajustada pela watermark, mais os shards pendentes de execuções
+        anteriores que ela não cobre.
+
+        Returns:
+            (consultas, dias pulados pela watermark)
+        """
+        escopo = escopo or [(None, mod) for mod in MODALIDADES_PADRAO]
+        horizonte = (date.today() + timedelta(days=HORIZONTE_PROPOSTAS_DIAS)).isoformat()
+        bases = []
+        for fonte in self.fontes:
+            if fonte in FONTES_FILTRAVEIS:
+                bases += [{"fonte": fonte, "uf": uf, "modalidade": mod} for uf, mod in escopo]
+            else:
+                bases.append({"fonte": fonte})
+
+        consultas = []
+        pulados = []
+        for base in bases:
+            if base["fonte"] in FONTES_SEM_WATERMARK:
+                # Propostas abertas: retrato atual, encerramentos até o horizonte
+                consultas.append({**base, "data_inicio": data_inicio, "data_fim": horizonte})
+                continue
+            chave = (base["fonte"], base.get("uf"), base.get("modalidade"))
+            inicio = watermarks.inicio(*chave, data_inicio, ultima_busca)
+            pulados.append(dias_pulados(data_inicio, inicio))
+
+            shards = [(inicio, data_fim)] if inicio <= data_fim else []
+            shards += [
+                s for s in watermarks.shards_pendentes(*chave)
+                if not (shards and contido(s, shards[0]))
+            ]
+            consultas += [
+                {**base, "data_inicio": ini, "data_fim": fim} for ini, fim in shards
+            ]
+        return consultas, min(pulados, default=0)
+
+    def _carregar_watermarks(self) -> Watermarks:
         try:
-            pregoes = self.api.buscar_pregoes(data_inicio, data_fim, max_pages=2)
-            todos.extend(pregoes)
+            return Watermarks(db.listar_watermarks())
         except Exception as e:
-            print(f"Erro busca pregões: {e}")
+            print(f"Erro carregando watermarks: {e}")
+            return Watermarks()
 
-        # 3. Licitações legado
+    def _salvar_watermarks(self, watermarks: Watermarks):
         try:
-            licitacoes = self.api.buscar_licitacoes_legado(data_inicio, data_fim, max_pages=2)
-            todos.extend(licitacoes)
+            db.salvar_watermarks(watermarks.pendentes())
         except Exception as e:
-            print(f"Erro busca licitações legado: {e}")
-
-        # Deduplicar por id_compra
-        vistos = set()
-        unicos = []
-        for lic in todos:
-            id_c = lic.get("id_compra", "")
-            if id_c and id_c not in vistos:
-                vistos.add(id_c)
-                unicos.append(lic)
-            elif not id_c:
-                unicos.append(lic)
-
-        return unicos
+            print(f"Erro salvando watermarks: {e}")
 
     def _salvar_resultados(self, matches: list, perfil_id: str) -> int:
-        """Salva licitações e vínculos no Supabase. Retorna quantidade de novas."""
-        novas = 0
+        """
+        Salva licitações, vínculos e status iniciais numa transação por lote
+        (função ingerir_licitacoes do banco). Retorna quantas licitações são
+        de fato novas — as já salvas, mudando ou não, não contam.
+        """
+        # Uma linha por id_compra (o upsert não aceita a mesma chave duas vezes)
+        por_id = {}
         for m in matches:
-            lic = m["licitacao"]
-            # Remover dados_brutos para o upsert (serializamos separado)
-            lic_save = {k: v for k, v in lic.items() if k != "dados_brutos"}
-            # Converter dados_brutos para string se necessário
-            if lic.get("dados_brutos"):
-                import json
-                lic_save["dados_brutos"] = json.dumps(lic["dados_brutos"], default=str)
-
-            try:
-                result = db.salvar_licitacao(lic_save)
-                if result:
-                    lic_id = result[0]["id"] if isinstance(result, list) and result else None
-                    if lic_id:
-                        novas += 1
-                        # Vincular ao perfil
-                        db.vincular_licitacao_perfil(
-                            lic_id, perfil_id, m["termo"], m["score"]
-                        )
-                        # Criar status inicial
-                        db.atualizar_status_licitacao(lic_id, "nova", self._calcular_prioridade(lic))
-            except Exception as e:
-                print(f"Erro salvando licitação: {e}")
-                continue
-        return novas
+            por_id.setdefault(m["licitacao"].get("id_compra"), m)
+        if not por_id:
+            return 0
+
+        # Licitacao → dict só aqui; dados_brutos vai como texto JSON
+        linhas = db.ingerir_licitacoes([
+            {"licitacao": m["licitacao"].para_dict(), "perfil_id": perfil_id,
+             "termo_encontrado": m["termo"], "score_match": m["score"],
+             "prioridade": self._calcular_prioridade(m["licitacao"])}
+            for m in por_id.values()
+        ])
+        return sum(1 for row in linhas if row["resultado"] == "inserted")
 
     def _calcular_prioridade(self, lic: dict) -> str:
         """Calcula prioridade com base em prazo e valor."""
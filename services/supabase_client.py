@@ -2,17 +2,57 @@
 Licitaflix — Supabase Client
 Conexão e operações CRUD com o banco Supabase.
 """
+import base64
+import json
 import os
+import threading
+
+import httpx
 import streamlit as st
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Pool HTTP do client compartilhado (conexões keep-alive reaproveitadas)
+LIMITES_POOL = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
 
-def get_client() -> Client:
-    """Retorna instância do Supabase client (com cache do Streamlit)."""
-    # Tenta carregar do .env primeiro
+# Erros de conexão (ex.: keep-alive derrubado pelo servidor) refeitos numa conexão nova
+_ERROS_CONEXAO = (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError)
+
+
+class _TransporteReconectando(httpx.BaseTransport):
+    """
+    Transporte com pool que, numa falha de conexão, recria o pool e refaz a
+    requisição uma vez — só se ela for idempotente (GET/PATCH/DELETE ou
+    upsert), para não duplicar inserts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._transporte = httpx.HTTPTransport(limits=LIMITES_POOL)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        transporte = self._transporte
+        try:
+            return transporte.handle_request(request)
+        except _ERROS_CONEXAO:
+            upsert = "resolution=" in request.headers.get("prefer", "")
+            if request.method == "POST" and not upsert:
+                raise
+            with self._lock:
+                if self._transporte is transporte:  # Outra thread pode já ter recriado
+                    self._transporte = httpx.HTTPTransport(limits=LIMITES_POOL)
+                    transporte.close()
+            return self._transporte.handle_request(request)
+
+    def close(self):
+        self._transporte.close()
+
+
+def _credenciais() -> tuple:
+    """SUPABASE_URL/SUPABASE_KEY do .env ou, se ausentes, de st.secrets."""
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
 
@@ -22,7 +62,7 @@ def get_client() -> Client:
             url = st.secrets["SUPABASE_URL"]
         except (FileNotFoundError, KeyError):
             pass
-            
+
     if not key:
         try:
             key = st.secrets["SUPABASE_KEY"]
@@ -31,8 +71,78 @@ def get_client() -> Client:
 
     if not url or not key:
         raise ValueError("SUPABASE_URL e SUPABASE_KEY devem ser configurados no .env ou st.secrets")
-    
-    return create_client(url, key)
+    return url, key
+
+
+def _criar_client() -> Client:
+    url, key = _credenciais()
+    http = httpx.Client(transport=_TransporteReconectando(), timeout=TIMEOUT)
+    return create_client(url, key, options=ClientOptions(
+        httpx_client=http, postgrest_client_timeout=TIMEOUT
+    ))
+
+
+# Sob o Streamlit o client vive no cache de recursos (um por processo, entre
+# reruns e sessões); fora dele, num singleton do módulo
+_criar_client_streamlit = st.cache_resource(show_spinner=False)(_criar_client)
+
+_client = None
+_client_injetado = None
+_client_lock = threading.Lock()
+
+
+def _em_streamlit() -> bool:
+    try:
+        from streamlit import runtime
+        return runtime.exists()
+    except ImportError:
+        return False
+
+
+def get_client() -> Client:
+    """Client compartilhado do processo (thread-safe, pool HTTP com keep-alive)."""
+    global _client
+    if _client_injetado is not None:
+        return _client_injetado
+    if _em_streamlit():
+        return _criar_client_streamlit()
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _criar_client()
+    return _client
+
+
+def definir_client(client):
+    """Injeta o client usado por todas as funções (ex.: dublê de testes); None desfaz."""
+    global _client_injetado
+    _client_injetado = client
+
+
+def reconectar() -> Client:
+    """Descarta o client compartilhado e cria outro (credenciais relidas)."""
+    global _client
+    with _client_lock:
+        _client = None
+    _criar_client_streamlit.clear()
+    return get_client()
+
+
+def verificar_conexao() -> bool:
+    """Health check: consulta mínima; se falhar, reconecta e tenta mais uma vez."""
+    for tentativa in range(2):
+        try:
+            get_client().table("categorias").select("id").limit(1).execute()
+            return True
+        except Exception as e:
+            print(f"Health check do Supabase falhou: {e}")
+            if tentativa == 0 and _client_injetado is None:
+                try:
+                    reconectar()
+                except Exception as e:
+                    print(f"Erro reconectando ao Supabase: {e}")
+                    return False
+    return False
 
 
 # ============================================
@@ -72,7 +182,7 @@ def listar_perfis_hoje():
     """Retorna perfis marcados para buscar hoje."""
     sb = get_client()
     return sb.table("perfis_busca").select(
-        "*, categorias(nome, icone, cor), termos_busca(id, termo, ativo, score_relevancia)"
+        "*, categorias(nome, icone, cor), termos_busca(id, termo, ativo, score_relevancia, vezes_encontrado)"
     ).eq("ativo", True).eq("buscar_hoje", True).order("nome").execute().data
 
 
@@ -85,9 +195,13 @@ def atualizar_buscar_hoje(perfil_id: str, buscar: bool):
 
 def criar_perfil(nome: str, categoria_id: str, descricao: str = "",
                  valor_minimo: float = None, valor_maximo: float = None,
-                 regioes: list = None, modalidades: list = None):
+                 regioes: list = None, modalidades: list = None, modo_match: str = "fuzzy",
+                 termos_exclusao: list = None, excluir_encerradas: bool = False):
     sb = get_client()
-    data = {"nome": nome, "categoria_id": categoria_id, "descricao": descricao}
+    data = {"nome": nome, "categoria_id": categoria_id, "descricao": descricao,
+            "modo_match": modo_match, "excluir_encerradas": excluir_encerradas}
+    if termos_exclusao:
+        data["termos_exclusao"] = termos_exclusao
     if valor_minimo is not None:
         data["valor_minimo"] = valor_minimo
     if valor_maximo is not None:
@@ -140,22 +254,49 @@ def salvar_licitacao(dados: dict):
     ).execute().data
 
 
-def salvar_licitacoes_batch(lista: list):
-    """Salva múltiplas licitações de uma vez."""
+def ingerir_licitacoes(itens: list, lote: int = 500) -> list:
+    """
+    Grava licitações, vínculos e status numa transação por lote, via a
+    função `ingerir_licitacoes` do schema.sql (uma ida ao banco por lote).
+    Um lote que falha é refeito item a item.
+
+    Args:
+        itens: {"licitacao": dict, "perfil_id", "termo_encontrado",
+            "score_match", "prioridade"}
+
+    Returns:
+        uma linha por id_compra: {id_compra, licitacao_id, resultado}, com
+        resultado 'inserted', 'updated' ou 'unchanged'
+    """
     sb = get_client()
-    if not lista:
-        return []
-    return sb.table("licitacoes").upsert(
-        lista, on_conflict="id_compra"
-    ).execute().data
+    linhas = []
+    for i in range(0, len(itens), lote):
+        parte = itens[i:i + lote]
+        try:
+            linhas += sb.rpc("ingerir_licitacoes", {"itens": parte}).execute().data or []
+        except Exception as e:
+            print(f"Erro ingerindo lote {i // lote + 1} de licitações: {e} — refazendo item a item")
+            for item in parte:
+                try:
+                    linhas += sb.rpc("ingerir_licitacoes", {"itens": [item]}).execute().data or []
+                except Exception as e:
+                    print(f"Erro ingerindo licitação {item['licitacao'].get('id_compra')}: {e}")
+    return linhas
 
 
-def listar_licitacoes(filtros: dict = None, limite: int = 50, pagina: int = 1):
+COLUNAS_FEED = "*, licitacao_status(*), licitacao_perfil(*, perfis_busca(nome, categorias(nome, icone, cor)))"
+
+
+def _consulta_licitacoes(filtros: dict = None):
+    """Consulta do Feed com filtros; com busca_texto, vem ranqueada por relevância."""
     sb = get_client()
-    offset = (pagina - 1) * limite
-    query = sb.table("licitacoes").select(
-        "*, licitacao_status(*), licitacao_perfil(*, perfis_busca(nome, categorias(nome, icone, cor)))"
-    ).order("data_publicacao", desc=True).range(offset, offset + limite - 1)
+    if filtros and filtros.get("busca_texto"):
+        # Busca ranqueada (FTS + trecho do objeto) — já vem ordenada por relevância
+        query = sb.rpc("buscar_licitacoes", {"consulta": filtros["busca_texto"]}).select(COLUNAS_FEED)
+    else:
+        query = sb.table("licitacoes").select(COLUNAS_FEED).order(
+            "data_publicacao", desc=True
+        ).order("id", desc=True)
 
     if filtros:
         if filtros.get("uf"):
@@ -164,9 +305,78 @@ def listar_licitacoes(filtros: dict = None, limite: int = 50, pagina: int = 1):
             query = query.eq("modalidade", filtros["modalidade"])
         if filtros.get("status"):
             pass  # Filter via join
-        if filtros.get("busca_texto"):
-            query = query.ilike("objeto", f"%{filtros['busca_texto']}%")
-    return query.execute().data
+    return query
+
+
+def listar_licitacoes(filtros: dict = None, limite: int = 50, pagina: int = 1):
+    offset = (pagina - 1) * limite
+    return _consulta_licitacoes(filtros).range(offset, offset + limite - 1).execute().data
+
+
+def _codificar_cursor(posicao: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(posicao, separators=(",", ":")).encode()).decode()
+
+
+def _decodificar_cursor(cursor: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+
+def listar_licitacoes_pagina(filtros: dict = None, limite: int = 50, cursor: str = None) -> tuple:
+    """
+    Página do Feed por keyset em (data_publicacao, id), do mais recente ao
+    mais antigo: cada página continua depois da última linha da anterior, sem
+    OFFSET — o custo não cresce com a profundidade e linhas que chegam no
+    meio da navegação não deslocam as páginas seguintes.
+
+    Com busca_texto a ordem é por relevância e o cursor guarda a posição.
+
+    Args:
+        cursor: opaco, devolvido pela página anterior (None = primeira página)
+
+    Returns:
+        (licitações, próximo cursor — None quando não há mais páginas)
+    """
+    query = _consulta_licitacoes(filtros)
+    posicao = _decodificar_cursor(cursor) if cursor else {}
+    ranqueada = bool(filtros and filtros.get("busca_texto"))
+
+    if ranqueada:
+        offset = posicao.get("offset", 0)
+        dados = query.range(offset, offset + limite - 1).execute().data
+        proximo = {"offset": offset + len(dados)}
+    else:
+        if posicao:
+            # ORDER BY data_publicacao DESC (nulos primeiro), id DESC
+            data, ultimo_id = posicao["data"], posicao["id"]
+            if data is None:
+                query = query.or_(f"and(data_publicacao.is.null,id.lt.{ultimo_id}),data_publicacao.not.is.null")
+            else:
+                query = query.or_(f"data_publicacao.lt.{data},and(data_publicacao.eq.{data},id.lt.{ultimo_id})")
+        dados = query.limit(limite).execute().data
+        proximo = {"data": dados[-1]["data_publicacao"], "id": dados[-1]["id"]} if dados else None
+
+    if len(dados) < limite:
+        return dados, None
+    return dados, _codificar_cursor(proximo)
+
+
+def iterar_licitacoes(colunas: str = "*", lote: int = 1000):
+    """
+    Percorre a tabela licitacoes inteira em páginas de `lote` linhas, por
+    keyset em id (cada página continua depois do último id, sem OFFSET).
+    `colunas` precisa incluir id.
+    """
+    sb = get_client()
+    ultimo_id = None
+    while True:
+        query = sb.table("licitacoes").select(colunas).order("id").limit(lote)
+        if ultimo_id is not None:
+            query = query.gt("id", ultimo_id)
+        dados = query.execute().data
+        yield from dados
+        if len(dados) < lote:
+            break
+        ultimo_id = dados[-1]["id"]
 
 
 def buscar_licitacao_por_id(licitacao_id: str):
@@ -202,6 +412,29 @@ def vincular_licitacao_perfil(licitacao_id: str, perfil_id: str, termo: str, sco
         pass  # Ignora duplicatas
 
 
+def vincular_licitacoes_perfil_batch(vinculos: list, ignorar_existentes: bool = False,
+                                     lote: int = 500) -> int:
+    """
+    Upsert em lote de vínculos (licitacao_id, perfil_id, termo_encontrado,
+    score_match). Com `ignorar_existentes`, vínculos já gravados ficam como
+    estão (só os novos entram). Cada lote falha sozinho.
+
+    Returns:
+        vínculos gravados
+    """
+    sb = get_client()
+    gravados = 0
+    for i in range(0, len(vinculos), lote):
+        try:
+            gravados += len(sb.table("licitacao_perfil").upsert(
+                vinculos[i:i + lote], on_conflict="licitacao_id,perfil_id",
+                ignore_duplicates=ignorar_existentes,
+            ).execute().data or [])
+        except Exception as e:
+            print(f"Erro vinculando lote {i // lote + 1}: {e}")
+    return gravados
+
+
 # ============================================
 # STATUS DE LICITAÇÃO
 # ============================================
@@ -231,6 +464,25 @@ def registrar_busca(perfil_id: str, termo: str, total_resultados: int):
     }).execute().data
 
 
+# ============================================
+# SINCRONIZAÇÃO INCREMENTAL (watermarks)
+# ============================================
+
+def listar_watermarks():
+    sb = get_client()
+    return sb.table("sync_watermarks").select("*").execute().data
+
+
+def salvar_watermarks(lista: list):
+    """Upsert das watermarks por (endpoint, uf, modalidade)."""
+    sb = get_client()
+    if not lista:
+        return []
+    return sb.table("sync_watermarks").upsert(
+        lista, on_conflict="endpoint,uf,modalidade"
+    ).execute().data
+
+
 # ============================================
 # TERMOS SUGERIDOS
 # ============================================
@@ -0,0 +1,366 @@
+"""
+Licitaflix — Transporte HTTP resiliente
+Limitador token-bucket com taxa adaptativa (respeita Retry-After), retries com backoff exponencial
+e jitter, circuit breaker e concorrência adaptativa por host.
+
+Compartilhado pelos clientes síncronos (requests) e assíncronos (httpx).
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+
+STATUS_RETRY = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe; `reservar()` devolve quanto esperar.
+
+    A taxa é AIMD entre `taxa_min` e `taxa_max`: +`incremento` req/s a cada
+    `ceil(taxa)` sucessos seguidos (~1 s sem limitação) e metade quando a
+    API limita (429/503).
+    """
+
+    def __init__(self, taxa: float = 5.0, capacidade: int = 5, taxa_min: float = 0.5,
+                 taxa_max: float = None, incremento: float = 0.5):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.taxa_min = taxa_min
+        self.taxa_max = taxa if taxa_max is None else taxa_max
+        self.incremento = incremento
+        self._tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._pausado_ate = 0.0
+        self._sucessos = 0
+        self._lock = threading.Lock()
+
+    def _repor(self, agora: float):
+        """Repõe os tokens acumulados desde a última chamada (com _lock travado)."""
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def reservar(self) -> float:
+        """Consome um token e retorna o tempo de espera (segundos)."""
+        with self._lock:
+            agora = time.monotonic()
+            self._repor(agora)
+            self._tokens -= 1
+            espera = -self._tokens / self.taxa if self._tokens < 0 else 0.0
+            return max(espera, self._pausado_ate - agora)
+
+    def pausar(self, segundos: float):
+        """Bloqueia novas requisições (ex.: Retry-After de um 429)."""
+        with self._lock:
+            self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+
+    def sucesso(self):
+        with self._lock:
+            self._sucessos += 1
+            if self._sucessos >= math.ceil(self.taxa) and self.taxa < self.taxa_max:
+                self._repor(time.monotonic())
+                self.taxa = min(self.taxa_max, self.taxa + self.incremento)
+                self._sucessos = 0
+
+    def reduzir(self):
+        with self._lock:
+            self._repor(time.monotonic())
+            self.taxa = max(self.taxa_min, self.taxa / 2)
+            self._sucessos = 0
+
+
+class CircuitBreaker:
+    """Abre após falhas consecutivas; depois do intervalo deixa uma tentativa passar."""
+
+    def __init__(self, limite_falhas: int = 5, tempo_aberto: float = 30.0):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._lock = threading.Lock()
+
+    def permite(self) -> bool:
+        with self._lock:
+            return time.monotonic() >= self._aberto_ate
+
+    def sucesso(self):
+        with self._lock:
+            self._falhas = 0
+
+    def falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self._falhas >= self.limite_falhas:
+                self._aberto_ate = time.monotonic() + self.tempo_aberto
+                self._falhas = 0
+
+
+class ConcorrenciaAdaptativa:
+    """
+    Limite de requisições simultâneas em AIMD: cresce +1 a cada `limite`
+    sucessos seguidos e cai pela metade quando a API limita (429/503).
+    """
+
+    def __init__(self, minimo: int = 1, maximo: int = 16, inicial: int = 4):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.limite = inicial
+        self._sucessos = 0
+        self._em_voo = 0
+        self._cond = threading.Condition()
+        self._eventos = {}  # event loop -> asyncio.Event dos seus waiters
+
+    def sucesso(self):
+        with self._cond:
+            self._sucessos += 1
+            if self._sucessos >= self.limite and self.limite < self.maximo:
+                self.limite += 1
+                self._sucessos = 0
+                self._acordar()
+
+    def reduzir(self):
+        with self._cond:
+            self.limite = max(self.minimo, self.limite // 2)
+            self._sucessos = 0
+
+    def _acordar(self):
+        """Acorda quem espera vaga: threads e os waiters de cada event loop (com _cond travado)."""
+        self._cond.notify_all()
+        for loop, evento in list(self._eventos.items()):
+            try:
+                loop.call_soon_threadsafe(evento.set)
+            except RuntimeError:  # Loop já encerrado (busca terminou)
+                del self._eventos[loop]
+
+    # --- Uso síncrono (threads) ---
+
+    def __enter__(self):
+        with self._cond:
+            while self._em_voo >= self.limite:
+                self._cond.wait()
+            self._em_voo += 1
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._em_voo -= 1
+            self._acordar()
+
+    # --- Uso assíncrono (vários event loops, um por thread de busca) ---
+
+    async def entrar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._em_voo < self.limite:
+                    self._em_voo += 1
+                    return
+                # Um Event por loop, acordado de qualquer thread via call_soon_threadsafe
+                evento = self._eventos.get(loop)
+                if evento is None:
+                    evento = self._eventos[loop] = asyncio.Event()
+                evento.clear()
+            await evento.wait()
+
+    async def sair(self):
+        with self._cond:
+            self._em_voo -= 1
+            self._acordar()
+
+
+class EstatisticasTransporte:
+    """
+    Contadores de requisições, retries, throttling e páginas perdidas.
+
+    O transporte é compartilhado pelo processo; cada busca passa o seu
+    objeto em `get`/`aget` para contar só as próprias requisições.
+    """
+
+    CHAVES = ("requisicoes", "retries", "throttles", "paginas_perdidas", "circuito_aberto")
+
+    def __init__(self):
+        self._valores = dict.fromkeys(self.CHAVES, 0)
+        self._lock = threading.Lock()
+
+    def contar(self, chave: str):
+        with self._lock:
+            self._valores[chave] += 1
+
+    def como_dict(self) -> dict:
+        with self._lock:
+            return dict(self._valores)
+
+
+class _Host:
+    """Estado de controle de um host."""
+
+    def __init__(self, taxa: float, taxa_max: float, concorrencia_max: int):
+        self.bucket = TokenBucket(taxa, capacidade=max(1, int(taxa)), taxa_max=taxa_max)
+        self.breaker = CircuitBreaker()
+        self.concorrencia = ConcorrenciaAdaptativa(maximo=concorrencia_max)
+
+
+def _retry_after(valor) -> Optional[float]:
+    """Interpreta o header Retry-After (segundos ou data HTTP)."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Transporte:
+    """
+    GET resiliente com estatísticas de retries, throttling e páginas perdidas.
+
+    `taxa` é a taxa inicial (req/s) de cada host; o AIMD a leva até `taxa_max`.
+    """
+
+    def __init__(self, taxa: float = 5.0, taxa_max: float = 10.0, max_tentativas: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 concorrencia_max: int = 16, timeout: float = 30):
+        self.taxa = taxa
+        self.taxa_max = taxa_max
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.concorrencia_max = concorrencia_max
+        self.timeout = timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.stats = EstatisticasTransporte()  # Totais do processo
+
+    def _host(self, url: str) -> _Host:
+        nome = urlparse(url).netloc
+        with self._lock:
+            if nome not in self._hosts:
+                self._hosts[nome] = _Host(self.taxa, self.taxa_max, self.concorrencia_max)
+            return self._hosts[nome]
+
+    def _contar(self, chave: str, stats: EstatisticasTransporte = None):
+        self.stats.contar(chave)
+        if stats is not None:
+            stats.contar(chave)
+
+    def estatisticas(self) -> dict:
+        return self.stats.como_dict()
+
+    def _backoff(self, tentativa: int) -> float:
+        """Backoff exponencial com full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** tentativa))
+
+    def _avaliar(self, host: _Host, status: Optional[int], headers, tentativa: int,
+                 stats: EstatisticasTransporte = None):
+        """
+        Decide o que fazer com uma resposta.
+
+        Returns:
+            (acao, espera) — acao em "ok", "retry" ou "falha"
+        """
+        if status in (200, 204):
+            host.breaker.sucesso()
+            host.concorrencia.sucesso()
+            host.bucket.sucesso()
+            return "ok", 0.0
+        if status is not None and status not in STATUS_RETRY:
+            return "falha", 0.0  # Erro do cliente (4xx): repetir não adianta
+
+        espera = self._backoff(tentativa)
+        if status in (429, 503):
+            self._contar("throttles", stats)
+            host.concorrencia.reduzir()
+            host.bucket.reduzir()
+            retry_after = _retry_after(headers.get("Retry-After") if headers else None)
+            if retry_after is not None:
+                espera = min(self.backoff_max, retry_after)
+                host.bucket.pausar(espera)
+        else:
+            host.breaker.falha()  # 5xx / erro de rede
+
+        if tentativa + 1 >= self.max_tentativas:
+            return "falha", 0.0
+        return "retry", espera
+
+    def get(self, session, url: str, params: dict, stats: EstatisticasTransporte = None):
+        """
+        GET síncrono (requests.Session). Retorna a resposta 200/204 ou None.
+        `stats` recebe, além dos totais do processo, os contadores desta chamada.
+        """
+        host = self._host(url)
+        for tentativa in range(self.max_tentativas):
+            if not host.breaker.permite():
+                self._contar("circuito_aberto", stats)
+                break
+            resp, erro = None, None
+            with host.concorrencia:
+                time.sleep(host.bucket.reservar())
+                self._contar("requisicoes", stats)
+                try:
+                    resp = session.get(url, params=params, timeout=self.timeout)
+                except Exception as e:
+                    erro = e
+            status = resp.status_code if resp is not None else None
+            acao, espera = self._avaliar(
+                host, status, resp.headers if resp is not None else None, tentativa, stats
+            )
+            if acao == "ok":
+                return resp
+            if acao == "falha":
+                print(f"Erro API {url}: {erro or status}")
+                break
+            self._contar("retries", stats)
+            time.sleep(espera)
+        self._contar("paginas_perdidas", stats)
+        return None
+
+    async def aget(self, client, url: str, params: dict, stats: EstatisticasTransporte = None):
+        """GET assíncrono (httpx.AsyncClient). Retorna a resposta 200/204 ou None (ver `get`)."""
+        host = self._host(url)
+        for tentativa in range(self.max_tentativas):
+            if not host.breaker.permite():
+                self._contar("circuito_aberto", stats)
+                break
+            resp, erro = None, None
+            await host.concorrencia.entrar()
+            try:
+                await asyncio.sleep(host.bucket.reservar())
+                self._contar("requisicoes", stats)
+                resp = await client.get(url, params=params, timeout=self.timeout)
+            except Exception as e:
+                erro = e
+            finally:
+                await host.concorrencia.sair()
+            status = resp.status_code if resp is not None else None
+            acao, espera = self._avaliar(
+                host, status, resp.headers if resp is not None else None, tentativa, stats
+            )
+            if acao == "ok":
+                return resp
+            if acao == "falha":
+                print(f"Erro API {url}: {erro or status}")
+                break
+            self._contar("retries", stats)
+            await asyncio.sleep(espera)
+        self._contar("paginas_perdidas", stats)
+        return None
+
+
+_transporte = None
+_transporte_lock = threading.Lock()
+
+
+def obter_transporte() -> Transporte:
+    """Transporte compartilhado do processo (limites e breakers por host)."""
+    global _transporte
+    with _transporte_lock:
+        if _transporte is None:
+            _transporte = Transporte()
+        return _transporte
@@ -0,0 +1,161 @@
+"""
+Licitaflix — Match vetorial
+Modo de match alternativo ao fuzzy (perfis_busca.modo_match = 'vetorial').
+
+TF-IDF de n-gramas de caracteres (por palavra, com borda) ajustado sobre o
+corpus; os termos de cada perfil viram vetores de consulta no mesmo espaço e
+a similaridade de cosseno do corpus inteiro sai de um único produto de
+matrizes esparsas. Cada perfil fica com os top-k objetos acima do limiar.
+Ao contrário do partial_ratio, o custo não cresce com o tamanho do objeto ao
+quadrado e objetos longos não casam só por conterem trechos parecidos.
+"""
+import numpy as np
+
+from services.normalizacao import normalizar_licitacao, normalizar_termo, tokens
+
+try:
+    from scipy import sparse
+    VETORIAL_DISPONIVEL = True
+except ImportError:  # Sem scipy: perfis vetoriais caem no fuzzy
+    VETORIAL_DISPONIVEL = False
+
+NGRAMAS = (3, 5)   # Tamanhos mínimo e máximo dos n-gramas
+LIMIAR = 0.35      # Similaridade mínima (0–1)
+TOP_K = 500        # Máximo de matches por perfil (o excedente sai em "truncadas")
+
+
+class VetorizadorTfidf:
+    """TF-IDF (tf sublinear, idf suavizado, norma L2) de n-gramas de caracteres."""
+
+    def __init__(self, ngramas: tuple = NGRAMAS):
+        self.ngramas = ngramas
+        self.vocabulario = {}  # n-grama -> coluna
+        self.idf = None
+        self._ids_token = {}   # token -> colunas dos seus n-gramas (com repetição)
+
+    def _ngramas(self, tok: str) -> list:
+        padded = f" {tok} "
+        n_min, n_max = self.ngramas
+        return [padded[i:i + n] for n in range(n_min, n_max + 1)
+                for i in range(len(padded) - n + 1)]
+
+    def _colunas_token(self, tok: str, ajustando: bool) -> list:
+        ids = self._ids_token.get(tok)
+        if ids is None:
+            if not ajustando:  # Fora do ajuste: só n-gramas já conhecidos
+                return [c for c in map(self.vocabulario.get, self._ngramas(tok)) if c is not None]
+            ids = self._ids_token[tok] = [
+                self.vocabulario.setdefault(g, len(self.vocabulario)) for g in self._ngramas(tok)
+            ]
+        return ids
+
+    def _contagens(self, documentos: list, ajustando: bool):
+        """Contagens (documentos × n-gramas) = (documentos × tokens) @ (tokens × n-gramas)."""
+        locais = {}  # token -> linha em T
+        linhas_d, colunas_d = [], []
+        for i, toks in enumerate(documentos):
+            linhas_d.extend([i] * len(toks))
+            colunas_d.extend(locais.setdefault(tok, len(locais)) for tok in toks)
+        linhas_t, colunas_t = [], []
+        for tok, j in locais.items():
+            cols = self._colunas_token(tok, ajustando)
+            linhas_t.extend([j] * len(cols))
+            colunas_t.extend(cols)
+        d = sparse.csr_matrix(
+            (np.ones(len(colunas_d), dtype=np.float32), (linhas_d, colunas_d)),
+            shape=(len(documentos), len(locais)),
+        )
+        t = sparse.csr_matrix(
+            (np.ones(len(colunas_t), dtype=np.float32), (linhas_t, colunas_t)),
+            shape=(len(locais), len(self.vocabulario)),
+        )
+        m = (d @ t).tocsr()
+        m.sum_duplicates()
+        return m
+
+    def _ponderar(self, m):
+        m.data = 1.0 + np.log(m.data)      # tf sublinear
+        m = m @ sparse.diags(self.idf)
+        normas = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+        normas[normas == 0] = 1.0
+        return sparse.diags(1.0 / normas) @ m
+
+    def ajustar(self, documentos: list):
+        """
+        Ajusta vocabulário e idf e devolve a matriz (documentos × n-gramas).
+
+        Args:
+            documentos: tokens normalizados de cada documento
+        """
+        m = self._contagens(documentos, ajustando=True)
+        df = np.bincount(m.indices, minlength=m.shape[1])
+        self.idf = (np.log((1 + m.shape[0]) / (1 + df)) + 1).astype(np.float32)
+        return self._ponderar(m).tocsr()
+
+    def transformar(self, documentos: list):
+        """Vetores no espaço ajustado (n-gramas fora do vocabulário são ignorados)."""
+        return self._ponderar(self._contagens(documentos, ajustando=False)).tocsr()
+
+
+class MatcherVetorial:
+    """Matching dos perfis vetoriais por similaridade de cosseno."""
+
+    def __init__(self, perfis: list, limiar: float = LIMIAR, top_k: int = TOP_K):
+        """
+        Args:
+            perfis: (perfil_id, termos_ativos, aceita) — `aceita` é o
+                predicado de filtros do perfil
+        """
+        self.limiar = limiar
+        self.top_k = top_k
+        self.termos = []  # textos distintos (normalizados)
+        indice_termo = {}
+        self.perfis = []  # (perfil_id, colunas, termos_ativos, aceita)
+        for perfil_id, ativos, aceita in perfis:
+            colunas = []
+            for t in ativos:
+                texto = normalizar_termo(t["termo"])
+                if texto not in indice_termo:
+                    indice_termo[texto] = len(self.termos)
+                    self.termos.append(texto)
+                colunas.append(indice_termo[texto])
+            self.perfis.append((perfil_id, np.array(colunas), ativos, aceita))
+
+    def casar(self, licitacoes: list, resultados: dict):
+        """Acrescenta em `resultados` os matches de cada perfil vetorial."""
+        lics = [lic for lic in licitacoes if lic.get("objeto")]
+        aceitos = {
+            perfil_id: np.fromiter((aceita(lic) for lic in lics), dtype=bool, count=len(lics))
+            for perfil_id, _, _, aceita in self.perfis
+        }
+        relevante = np.zeros(len(lics), dtype=bool)
+        for a in aceitos.values():
+            relevante |= a
+        linhas = np.flatnonzero(relevante)
+        for perfil_id, _, _, _ in self.perfis:
+            resultados[perfil_id]["objetos"] += int(aceitos[perfil_id].sum())
+            resultados[perfil_id]["candidatos"] += int(aceitos[perfil_id].sum())
+        if not len(linhas) or not self.termos:
+            return
+
+        # Um ajuste e um produto esparso para o corpus inteiro
+        vetorizador = VetorizadorTfidf()
+        x = vetorizador.ajustar([normalizar_licitacao(lics[i]).tokens for i in linhas])
+        q = vetorizador.transformar([tokens(t) for t in self.termos])
+        similaridade = (x @ q.T).toarray()
+
+        for perfil_id, colunas, ativos, _ in self.perfis:
+            sub = similaridade[:, colunas]
+            melhores = sub.argmax(axis=1)
+            scores = sub[np.arange(len(linhas)), melhores]
+            scores[~aceitos[perfil_id][linhas]] = 0
+            acima = np.flatnonzero(scores >= self.limiar)
+            # Top-k por similaridade (empate: ordem do corpus); o excedente é reportado
+            resultados[perfil_id]["truncadas"] += max(0, len(acima) - self.top_k)
+            acima = acima[np.argsort(-scores[acima], kind="stable")][:self.top_k]
+            for k in acima:
+                j = melhores[k]
+                resultados[perfil_id]["matches"].append({
+                    "licitacao": lics[linhas[k]], "termo": ativos[j]["termo"],
+                    "score": round(float(scores[k]), 4), "termo_id": ativos[j].get("id"),
+                })
@@ -1,7 +1,16 @@
 """
-Setup script: executa o schema SQL no Supabase via API REST.
+Setup script: cria o schema e aplica as migrações pendentes no Postgres do Supabase.
 Uso: python setup_db.py
+
+Com SUPABASE_DB_URL (string de conexão Postgres do projeto, em Project
+Settings → Database) no .env:
+  1. banco vazio → executa o schema.sql (tabelas e dados iniciais);
+  2. aplica, em ordem, os arquivos de migrations/ ainda não registrados em
+     schema_migrations — cada um na sua transação.
+Rodar de novo não refaz nada. Sem SUPABASE_DB_URL, só verifica a conexão
+REST e mostra o passo a passo manual.
 """
+import glob
 import os
 import requests
 from dotenv import load_dotenv
@@ -10,57 +19,115 @@ load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("❌ Configure SUPABASE_URL e SUPABASE_KEY no .env")
-    exit(1)
-
-# Ler schema SQL
-schema_path = os.path.join(os.path.dirname(__file__), "schema.sql")
-with open(schema_path, "r", encoding="utf-8") as f:
-    sql = f.read()
-
-# Dividir em blocos (separar por ponto-e-vírgula + newline)
-blocos = [b.strip() for b in sql.split(";\n") if b.strip() and not b.strip().startswith("--")]
-
-print(f"🔧 Executando {len(blocos)} blocos SQL no Supabase...")
-print(f"📡 URL: {SUPABASE_URL}")
-
-headers = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "return=minimal"
-}
-
-# Usar a Supabase REST API para verificar a conexão
-try:
-    resp = requests.get(
-        f"{SUPABASE_URL}/rest/v1/",
-        headers=headers,
-        timeout=10
-    )
-    print(f"✅ Conexão OK (status: {resp.status_code})")
-except Exception as e:
-    print(f"❌ Erro de conexão: {e}")
-    exit(1)
-
-print("\n" + "=" * 50)
-print("❗ IMPORTANTE: Execute o schema.sql manualmente!")
-print("=" * 50)
-print(f"""
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(BASE, "schema.sql")
+MIGRACOES_DIR = os.path.join(BASE, "migrations")
+
+
+def listar_migracoes() -> list:
+    """(versão, caminho) de migrations/NNN_nome.sql, em ordem."""
+    return [
+        (os.path.basename(caminho)[:-4], caminho)
+        for caminho in sorted(glob.glob(os.path.join(MIGRACOES_DIR, "*.sql")))
+    ]
+
+
+def ler(caminho: str) -> str:
+    with open(caminho, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def migrar(db_url: str):
+    """Schema base (banco vazio) + migrações pendentes; idempotente."""
+    import psycopg
+
+    with psycopg.connect(db_url, autocommit=True) as conn:
+        existe = conn.execute("SELECT to_regclass('public.licitacoes') IS NOT NULL").fetchone()[0]
+        if not existe:
+            print("🆕 Banco vazio — executando schema.sql...")
+            with conn.transaction():
+                conn.execute(ler(SCHEMA_PATH))
+            print("  ✅ schema.sql")
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                versao TEXT PRIMARY KEY,
+                aplicada_em TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        aplicadas = {row[0] for row in conn.execute("SELECT versao FROM schema_migrations")}
+        pendentes = [(v, c) for v, c in listar_migracoes() if v not in aplicadas]
+        if not pendentes:
+            print("✅ Nenhuma migração pendente.")
+            return
+
+        for versao, caminho in pendentes:
+            print(f"🔧 Aplicando {versao}...")
+            # A migração e o registro dela entram juntos (ou nenhum dos dois)
+            with conn.transaction():
+                conn.execute(ler(caminho))
+                conn.execute("INSERT INTO schema_migrations (versao) VALUES (%s)", (versao,))
+            print(f"  ✅ {versao}")
+        print(f"✅ {len(pendentes)} migração(ões) aplicada(s).")
+
+
+if __name__ == "__main__":
+    if SUPABASE_DB_URL:
+        print("🔧 Migrando o banco via conexão Postgres...")
+        try:
+            migrar(SUPABASE_DB_URL)
+        except ImportError:
+            print("❌ Instale o driver Postgres: pip install 'psycopg[binary]'")
+            exit(1)
+        except Exception as e:
+            print(f"❌ Erro na migração: {e}")
+            exit(1)
+        exit(0)
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print("❌ Configure SUPABASE_DB_URL (ou SUPABASE_URL e SUPABASE_KEY) no .env")
+        exit(1)
+
+    print(f"📡 URL: {SUPABASE_URL}")
+
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal"
+    }
+
+    # Usar a Supabase REST API para verificar a conexão
+    try:
+        resp = requests.get(
+            f"{SUPABASE_URL}/rest/v1/",
+            headers=headers,
+            timeout=10
+        )
+        print(f"✅ Conexão OK (status: {resp.status_code})")
+    except Exception as e:
+        print(f"❌ Erro de conexão: {e}")
+        exit(1)
+
+    migracoes = "\n".join(f"   📄 {caminho}" for _, caminho in listar_migracoes())
+    print("\n" + "=" * 50)
+    print("❗ IMPORTANTE: sem SUPABASE_DB_URL o schema é aplicado manualmente!")
+    print("=" * 50)
+    print(f"""
 O Supabase não permite executar DDL (CREATE TABLE) via API REST.
-Siga estes passos:
+Configure SUPABASE_DB_URL no .env e rode de novo, ou siga estes passos:
 
-1. Acesse: {SUPABASE_URL.replace('.co', '.co').replace('https://', 'https://supabase.com/dashboard/project/').split('.supabase')[0]}
-   Ou vá para https://supabase.com/dashboard e selecione seu projeto.
+1. Acesse https://supabase.com/dashboard e selecione seu projeto.
 
 2. No menu lateral, clique em "SQL Editor"
 
-3. Cole o conteúdo do arquivo schema.sql:
-   📄 {schema_path}
+3. Cole e execute o conteúdo do arquivo schema.sql (só em banco novo):
+   📄 {SCHEMA_PATH}
 
-4. Clique em "Run" (ou Ctrl+Enter)
+4. Execute, em ordem, as migrações:
+{migracoes}
 
 5. Verifique se as tabelas foram criadas em "Table Editor"
 
@@ -73,6 +140,7 @@ Tabelas que serão criadas:
   • licitacao_status
   • historico_buscas
   • termos_sugeridos
+  • sync_watermarks
 
 Dados iniciais incluídos:
   • 3 categorias (Produtos, Obras, Reformas)
@@ -80,21 +148,22 @@ Dados iniciais incluídos:
   • ~50 termos de busca
 """)
 
-# Tentar verificar se as tabelas já existem
-print("🔍 Verificando tabelas existentes...")
-tabelas = ["categorias", "perfis_busca", "termos_busca", "licitacoes", 
-           "licitacao_perfil", "licitacao_status", "historico_buscas", "termos_sugeridos"]
-
-for t in tabelas:
-    try:
-        resp = requests.get(
-            f"{SUPABASE_URL}/rest/v1/{t}?select=count&limit=0",
-            headers=headers,
-            timeout=5
-        )
-        if resp.status_code == 200:
-            print(f"  ✅ {t} — existe")
-        else:
-            print(f"  ❌ {t} — não encontrada (execute o schema.sql)")
-    except Exception:
-        print(f"  ⚠️ {t} — erro ao verificar")
+    # Tentar verificar se as tabelas já existem
+    print("🔍 Verificando tabelas existentes...")
+    tabelas = ["categorias", "perfis_busca", "termos_busca", "licitacoes",
+               "licitacao_perfil", "licitacao_status", "historico_buscas", "termos_sugeridos",
+               "sync_watermarks"]
+
+    for t in tabelas:
+        try:
+            resp = requests.get(
+                f"{SUPABASE_URL}/rest/v1/{t}?select=count&limit=0",
+                headers=headers,
+                timeout=5
+            )
+            if resp.status_code == 200:
+                print(f"  ✅ {t} — existe")
+            else:
+                print(f"  ❌ {t} — não encontrada (execute o schema.sql)")
+        except Exception:
+            print(f"  ⚠️ {t} — erro ao verificar")
@@ -0,0 +1,190 @@
+"""
+Planejamento da sincronização incremental (watermarks e shards).
+Uso: python test_incremental.py  (ou pytest test_incremental.py)
+
+Nenhuma chamada às APIs nem ao Supabase: a paginação usa páginas sintéticas.
+"""
+import asyncio
+import os
+
+os.environ.setdefault("LICITAFLIX_CACHE", "0")
+
+from services.async_api_client import AsyncComprasGovClient  # noqa: E402
+from services.incremental import Watermarks, planejar_shards  # noqa: E402
+from services.search_engine import SearchEngine  # noqa: E402
+
+CHAVE = ("comprasgov_14133", None, 1)
+
+
+def _watermarks(ultima_data: str = None, pendentes: list = None) -> Watermarks:
+    return Watermarks([{
+        "endpoint": CHAVE[0], "uf": "", "modalidade": CHAVE[2],
+        "ultima_data": ultima_data, "shards_pendentes": pendentes or [],
+    }])
+
+
+def test_planejar_shards():
+    assert planejar_shards("2026-10-01", "2026-10-03") == [
+        ("2026-10-01", "2026-10-01"), ("2026-10-02", "2026-10-02"), ("2026-10-03", "2026-10-03"),
+    ]
+    assert planejar_shards("2026-10-01", "2026-10-05", dias=2) == [
+        ("2026-10-01", "2026-10-02"), ("2026-10-03", "2026-10-04"), ("2026-10-05", "2026-10-05"),
+    ]
+    assert planejar_shards("2026-10-05", "2026-10-01") == []
+
+
+def test_inicio_margem_e_minimo():
+    wm = _watermarks("2026-10-10")
+    # Sem última busca (ou sem watermark): janela completa
+    assert wm.inicio(*CHAVE, "2026-10-01") == "2026-10-01"
+    assert Watermarks().inicio(*CHAVE, "2026-10-01", "2026-10-10") == "2026-10-01"
+    # Menor entre watermark e última busca, menos a margem de sobreposição
+    assert wm.inicio(*CHAVE, "2026-10-01", "2026-10-15T08:00:00") == "2026-10-09"
+    assert wm.inicio(*CHAVE, "2026-10-01", "2026-10-05") == "2026-10-04"
+    # Nunca antes do início pedido
+    assert wm.inicio(*CHAVE, "2026-10-12", "2026-10-15") == "2026-10-12"
+
+
+def test_shard_falho_fica_pendente_ate_completar():
+    wm = Watermarks()
+    wm.marcar_shard(*CHAVE, ("2026-10-02", "2026-10-02"), False)
+    wm.marcar_shard(*CHAVE, ("2026-10-03", "2026-10-03"), True)
+    wm.avancar(*CHAVE, "2026-10-03")
+    [linha] = wm.pendentes()
+    assert linha["ultima_data"] == "2026-10-03"
+    assert linha["shards_pendentes"] == [["2026-10-02", "2026-10-02"]]
+
+    # Próxima execução: a linha persistida volta com o shard pendente
+    wm = Watermarks([linha])
+    assert wm.shards_pendentes(*CHAVE) == [("2026-10-02", "2026-10-02")]
+    wm.marcar_shard(*CHAVE, ("2026-10-02", "2026-10-02"), True)
+    assert wm.pendentes()[0]["shards_pendentes"] == []
+
+
+def test_shard_completo_quita_pendentes_contidos():
+    wm = _watermarks("2026-10-01", pendentes=[
+        ["2026-10-02", "2026-10-02"], ["2026-10-20", "2026-10-20"],
+    ])
+    wm.marcar_shard(*CHAVE, ("2026-10-01", "2026-10-05"), True)
+    assert wm.shards_pendentes(*CHAVE) == [("2026-10-20", "2026-10-20")]
+
+
+def test_pendentes_so_alteradas():
+    wm = _watermarks("2026-10-10")
+    wm.avancar(*CHAVE, "2026-10-09")  # Não retrocede
+    wm.marcar_shard(*CHAVE, ("2026-10-10", "2026-10-10"), True)  # Nada muda
+    assert wm.pendentes() == []
+
+
+def test_montar_consultas_retoma_pendentes():
+    engine = SearchEngine(fontes=["comprasgov_14133"])
+    wm = _watermarks("2026-10-10", pendentes=[["2026-10-02", "2026-10-02"]])
+    consultas, pulados = engine._montar_consultas(
+        "2026-10-01", "2026-10-12", [(None, 1)], wm, ultima_busca="2026-10-12"
+    )
+    janelas = [(c["data_inicio"], c["data_fim"]) for c in consultas]
+    # Uma consulta com o delta desde a watermark (menos a margem) mais o shard pendente
+    assert janelas == [("2026-10-09", "2026-10-12"), ("2026-10-02", "2026-10-02")]
+    assert pulados == 8
+    assert all(c["uf"] is None and c["modalidade"] == 1 for c in consultas)
+
+
+def test_montar_consultas_por_par_do_escopo():
+    engine = SearchEngine(fontes=["comprasgov_14133", "comprasgov_legado"])
+    consultas, _ = engine._montar_consultas(
+        "2026-10-01", "2026-10-01", [(None, 6), ("SP", 1)], Watermarks()
+    )
+    assert [(c["fonte"], c.get("uf"), c.get("modalidade")) for c in consultas] == [
+        ("comprasgov_14133", None, 6), ("comprasgov_14133", "SP", 1), ("comprasgov_legado", None, None),
+    ]
+
+
+def test_montar_consultas_pula_pendente_coberto():
+    engine = SearchEngine(fontes=["comprasgov_14133"])
+    wm = _watermarks(pendentes=[["2026-10-03", "2026-10-03"]])
+    consultas, _ = engine._montar_consultas("2026-10-01", "2026-10-05", [(None, 1)], wm)
+    assert [(c["data_inicio"], c["data_fim"]) for c in consultas] == [("2026-10-01", "2026-10-05")]
+
+
+class _ClienteSintetico(AsyncComprasGovClient):
+    """Páginas sintéticas: `paginas(inicio, fim)` diz quantas há; `falhas` não respondem."""
+
+    def __init__(self, paginas, falhas=()):
+        super().__init__()
+        self.paginas = paginas
+        self.falhas = set(falhas)
+
+    async def _get_pagina(self, client, endpoint, params, pagina):
+        ini, fim = params["dataPublicacaoPncpInicial"], params["dataPublicacaoPncpFinal"]
+        if (ini, pagina) in self.falhas:
+            return None
+        total = self.paginas(ini, fim)
+        registro = {"idCompra": f"{ini}-{pagina}", "dataPublicacaoPncp": ini}
+        return [registro], total - pagina
+
+
+def _eventos(cliente, consultas, **kwargs) -> list:
+    async def coletar():
+        return [e async for e in cliente.iterar_consultas(consultas, **kwargs)]
+    return asyncio.run(coletar())
+
+
+def _consulta(ini: str, fim: str) -> dict:
+    return {"fonte": "comprasgov_14133", "data_inicio": ini, "data_fim": fim, "modalidade": 1}
+
+
+def test_shard_truncado_fica_incompleto():
+    cliente = _ClienteSintetico(lambda ini, fim: 10)
+    eventos = _eventos(cliente, [_consulta("2026-10-01", "2026-10-01")], max_pages=3)
+    assert sum(len(e[2]) for e in eventos if e[0] == "pagina") == 3
+    assert eventos[-1] == ("fim", 0, False)
+
+
+def test_consulta_grande_vira_shards_diarios():
+    # Janela de vários dias com muitas páginas; cada dia tem 2
+    cliente = _ClienteSintetico(
+        lambda ini, fim: 300 if ini != fim else 2, falhas={("2026-10-02", 2)}
+    )
+    eventos = _eventos(cliente, [_consulta("2026-10-01", "2026-10-03")],
+                       max_pages=None, dividir_acima=100)
+    shards = sorted(e[2] for e in eventos if e[0] == "shard")
+    assert shards == [
+        (("2026-10-01", "2026-10-01"), True), (("2026-10-02", "2026-10-02"), False),
+        (("2026-10-03", "2026-10-03"), True),
+    ]
+    assert eventos[-1] == ("fim", 0, False)
+    # Só os dias entram (a página 1 da janela inteira é descartada)
+    ids = sorted(r["id_compra"] for e in eventos if e[0] == "pagina" for r in e[2])
+    assert ids == ["2026-10-01-1", "2026-10-01-2", "2026-10-02-1", "2026-10-03-1", "2026-10-03-2"]
+
+    # Nas watermarks: o dia que falhou fica pendente e a watermark avança
+    wm = Watermarks()
+    consultas, maiores, divididas = [_consulta("2026-10-01", "2026-10-03")], ["2026-10-03"], {}
+    for evento in eventos:
+        if evento[0] != "pagina":
+            SearchEngine._registrar_fim(wm, consultas, maiores, divididas, *evento)
+    assert wm.shards_pendentes(*CHAVE) == [("2026-10-02", "2026-10-02")]
+    assert wm.pendentes()[0]["ultima_data"] == "2026-10-03"
+
+
+def test_consulta_pequena_nao_divide():
+    cliente = _ClienteSintetico(lambda ini, fim: 2)
+    eventos = _eventos(cliente, [_consulta("2026-10-01", "2026-10-03")],
+                       max_pages=None, dividir_acima=100)
+    assert not [e for e in eventos if e[0] == "shard"]
+    assert eventos[-1] == ("fim", 0, True)
+
+
+if __name__ == "__main__":
+    test_planejar_shards()
+    test_inicio_margem_e_minimo()
+    test_shard_falho_fica_pendente_ate_completar()
+    test_shard_completo_quita_pendentes_contidos()
+    test_pendentes_so_alteradas()
+    test_montar_consultas_retoma_pendentes()
+    test_montar_consultas_por_par_do_escopo()
+    test_montar_consultas_pula_pendente_coberto()
+    test_shard_truncado_fica_incompleto()
+    test_consulta_grande_vira_shards_diarios()
+    test_consulta_pequena_nao_divide()
+    print("✅ ok")
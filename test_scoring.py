@@ -0,0 +1,105 @@
+"""
+Paridade entre os backends de scoring (fuzzywuzzy × rapidfuzz).
+Uso: python test_scoring.py  (ou pytest test_scoring.py)
+
+O token_set_ratio é o mesmo nos dois. O partial_ratio do rapidfuzz procura o
+alinhamento ótimo, enquanto o do fuzzywuzzy usa uma heurística por blocos; por
+isso o score do rapidfuzz nunca é menor, e pode passar alguns pontos acima.
+"""
+import random
+import time
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from services.scoring import ScorerFuzzywuzzy, ScorerRapidfuzz, _processar_fuzzywuzzy
+
+SCORE_MINIMO = 60
+
+PALAVRAS = (
+    "aquisição material expediente contratação empresa especializada serviços limpeza "
+    "conservação predial registro preços eventual lousas vidro quadros brancos manutenção "
+    "preventiva corretiva ar condicionado equipamentos informática cadeiras mesas "
+    "mobiliário escolar gêneros alimentícios merenda veículos locação combustível "
+    "medicamentos hospitalar obras reforma pavimentação asfáltica iluminação pública "
+    "software licenças uniformes"
+).split()
+
+TERMOS = [
+    "lousa de vidro", "quadro branco", "ar condicionado", "limpeza predial",
+    "material de escritório", "manutenção", "cadeira", "merenda escolar",
+    "software", "pavimentação",
+]
+
+
+def gerar_objetos(n: int, semente: int = 0) -> list:
+    rnd = random.Random(semente)
+    return [" ".join(rnd.choices(PALAVRAS, k=rnd.randint(6, 20))) for _ in range(n)]
+
+
+def test_paridade(n: int = 1000, verbose: bool = False):
+    objetos = gerar_objetos(n)
+
+    inicio = time.perf_counter()
+    scores_fw, indices_fw = ScorerFuzzywuzzy().melhores(objetos, TERMOS)
+    tempo_fw = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    scores_rf, indices_rf = ScorerRapidfuzz().melhores(objetos, TERMOS)
+    tempo_rf = time.perf_counter() - inicio
+
+    # rapidfuzz nunca fica abaixo do fuzzywuzzy (alinhamento ótimo ≥ heurística)
+    assert all(rf >= fw for rf, fw in zip(scores_rf, scores_fw))
+
+    # Mesmo score → mesmo termo vencedor na grande maioria dos casos
+    iguais = [i for i in range(n) if scores_rf[i] == scores_fw[i]]
+    mesmo_termo = sum(indices_rf[i] == indices_fw[i] for i in iguais) / max(1, len(iguais))
+    assert mesmo_termo >= 0.95
+
+    # Decisão de match (SCORE_MINIMO) concorda na grande maioria dos casos
+    concordancia = sum(
+        (rf >= SCORE_MINIMO) == (fw >= SCORE_MINIMO) for rf, fw in zip(scores_rf, scores_fw)
+    ) / n
+    assert concordancia >= 0.95
+
+    if verbose:
+        print(f"📊 {n} objetos × {len(TERMOS)} termos")
+        print(f"  fuzzywuzzy {tempo_fw:.2f}s · rapidfuzz {tempo_rf:.3f}s "
+              f"({tempo_fw / tempo_rf:.0f}× mais rápido)")
+        print(f"  score idêntico em {len(iguais) / n:.1%} · mesmo termo {mesmo_termo:.1%} "
+              f"· decisão de match {concordancia:.1%}")
+
+
+def test_cascata(n: int = 2000, verbose: bool = False):
+    """A cascata (substring → token_set → partial com corte) decide igual à matriz cheia."""
+    objetos = gerar_objetos(n, semente=1)
+    grupos = [np.arange(0, 5), np.arange(5, 10)]  # Dois "perfis"
+
+    inicio = time.perf_counter()
+    cheia = np.rint(np.maximum(
+        process.cdist(objetos, TERMOS, scorer=fuzz.partial_ratio),
+        process.cdist([_processar_fuzzywuzzy(o) for o in objetos],
+                      [_processar_fuzzywuzzy(t) for t in TERMOS], scorer=fuzz.token_set_ratio),
+    )).astype(np.int16)
+    tempo_cheia = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    cascata = ScorerRapidfuzz().matriz(objetos, TERMOS, minimo=SCORE_MINIMO, grupos=grupos)
+    tempo_cascata = time.perf_counter() - inicio
+
+    for colunas in grupos:
+        melhor_cheia = cheia[:, colunas].max(axis=1)
+        melhor_cascata = cascata[:, colunas].max(axis=1)
+        # Mesmo melhor score sempre que ele decide o match
+        decide = melhor_cheia >= SCORE_MINIMO
+        assert (melhor_cheia[decide] == melhor_cascata[decide]).all()
+        assert not (melhor_cascata[~decide] >= SCORE_MINIMO).any()
+
+    if verbose:
+        print(f"  matriz cheia {tempo_cheia:.3f}s · cascata {tempo_cascata:.3f}s")
+
+
+if __name__ == "__main__":
+    test_paridade(2000, verbose=True)
+    test_cascata(2000, verbose=True)
+    print("✅ Paridade OK")
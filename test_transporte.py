@@ -0,0 +1,116 @@
+"""
+Limite de concorrência compartilhado entre event loops.
+Uso: python test_transporte.py  (ou pytest test_transporte.py)
+
+O transporte é único no processo, mas cada busca roda `asyncio.run` na sua
+própria thread: o limite precisa valer (e acordar quem espera) entre loops.
+"""
+import asyncio
+import threading
+
+from services.transporte import ConcorrenciaAdaptativa, EstatisticasTransporte, TokenBucket, Transporte
+
+
+def _rodar_loop(limitador, tarefas, resultados, maximo_visto, lock):
+    async def tarefa():
+        await limitador.entrar()
+        try:
+            with lock:
+                maximo_visto[0] = max(maximo_visto[0], limitador._em_voo)
+            await asyncio.sleep(0.005)
+        finally:
+            await limitador.sair()
+
+    async def principal():
+        await asyncio.wait_for(asyncio.gather(*(tarefa() for _ in range(tarefas))), timeout=10)
+
+    try:
+        asyncio.run(principal())
+        resultados.append("ok")
+    except Exception as e:
+        resultados.append(repr(e))
+
+
+def test_dois_loops_concorrentes():
+    limitador = ConcorrenciaAdaptativa()  # padrão: limite inicial 4
+    resultados, maximo_visto, lock = [], [0], threading.Lock()
+    threads = [
+        threading.Thread(target=_rodar_loop, args=(limitador, 20, resultados, maximo_visto, lock))
+        for _ in range(2)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert resultados == ["ok", "ok"]
+    assert limitador._em_voo == 0
+    assert maximo_visto[0] <= limitador.maximo
+
+
+def test_loop_e_threads_sincronas():
+    limitador = ConcorrenciaAdaptativa(inicial=2, maximo=2)
+    resultados, maximo_visto, lock = [], [0], threading.Lock()
+
+    def sincrono():
+        for _ in range(10):
+            with limitador:
+                with lock:
+                    maximo_visto[0] = max(maximo_visto[0], limitador._em_voo)
+
+    threads = [threading.Thread(target=sincrono) for _ in range(2)]
+    threads.append(threading.Thread(target=_rodar_loop, args=(limitador, 20, resultados, maximo_visto, lock)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert resultados == ["ok"]
+    assert limitador._em_voo == 0
+    assert maximo_visto[0] <= 2
+
+
+def test_taxa_aimd():
+    bucket = TokenBucket(taxa=4.0, taxa_min=1.0, taxa_max=5.0, incremento=0.5)
+    for _ in range(4):
+        bucket.sucesso()
+    assert bucket.taxa == 4.5
+    for _ in range(20):
+        bucket.sucesso()
+    assert bucket.taxa == 5.0  # Não passa do teto
+    bucket.reduzir()
+    assert bucket.taxa == 2.5
+    bucket.reduzir()
+    bucket.reduzir()
+    assert bucket.taxa == 1.0  # Nem do piso
+
+
+class _Resposta:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _Sessao:
+    def __init__(self, status):
+        self.status = list(status)
+
+    def get(self, url, params=None, timeout=None):
+        return _Resposta(self.status.pop(0), {"Retry-After": "0"})
+
+
+def test_estatisticas_por_chamada():
+    transporte = Transporte(taxa=100.0, backoff_base=0.0)
+    minhas, outras = EstatisticasTransporte(), EstatisticasTransporte()
+    assert transporte.get(_Sessao([429, 200]), "https://api.test/a", {}, minhas) is not None
+    assert transporte.get(_Sessao([200]), "https://api.test/b", {}, outras) is not None
+    assert minhas.como_dict()["requisicoes"] == 2 and minhas.como_dict()["throttles"] == 1
+    assert outras.como_dict()["requisicoes"] == 1 and outras.como_dict()["throttles"] == 0
+    assert transporte.estatisticas()["requisicoes"] == 3  # Totais do processo
+    assert transporte._host("https://api.test/").bucket.taxa < 100.0
+
+
+if __name__ == "__main__":
+    test_dois_loops_concorrentes()
+    test_loop_e_threads_sincronas()
+    test_taxa_aimd()
+    test_estatisticas_por_chamada()
+    print("✅ ok")